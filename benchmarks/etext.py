@@ -0,0 +1,42 @@
+#!python -u
+# -*- coding: utf-8 -*-
+"""
+Per chart time for embedded text.
+
+Builds the same LineGraph repeatedly, once with the process wide
+glyph cache cleared before every chart (the old behaviour) and
+once with the cache kept warm. Run from the source folder:
+
+$ python benchmarks/etext.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import svgplotlib
+from svgplotlib.Graph import LineGraph
+
+CHARTS = 200
+
+def chart():
+    return LineGraph(
+        range(20), [i*i for i in range(20)],
+        title = 'Response time per request',
+        xlabel = 'Request number',
+        ylabel = 'Time [ms]',
+    )
+
+def run(cold):
+    t0 = time.time()
+    for i in range(CHARTS):
+        if cold:
+            svgplotlib._glyphs.clear()
+        chart()
+    return (time.time() - t0) / CHARTS
+
+if __name__ == '__main__':
+    chart()
+    print 'no glyph cache  : %6.2f ms/chart' % (1000.*run(True))
+    print 'glyph cache     : %6.2f ms/chart' % (1000.*run(False))
@@ -0,0 +1,52 @@
+#!python -u
+# -*- coding: utf-8 -*-
+"""
+Import time benchmark.
+
+Each case runs in a fresh interpreter so module level work is
+included in the timing. Run from the source folder:
+
+$ python benchmarks/import_time.py
+"""
+import os
+import sys
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RUNS = 5
+
+CASES = (
+    ('import svgplotlib', '''
+import svgplotlib
+'''),
+    ('LineGraph, no TEX', '''
+from svgplotlib.Graph import LineGraph
+LineGraph((0,10,20), (0,50,25), title = 'Plot', xlabel = 'x', ylabel = 'y')
+'''),
+    ('LineGraph, TEX title', '''
+from svgplotlib.Graph import LineGraph
+LineGraph((0,10,20), (0,50,25), title = r'$\\alpha_i > \\beta_i$', xlabel = 'x', ylabel = 'y')
+'''),
+)
+
+TEMPLATE = '''
+import sys
+import time
+t0 = time.time()
+%s
+sys.stdout.write('%%f' %% (time.time() - t0))
+'''
+
+def timeit(code):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, (ROOT, env.get('PYTHONPATH'))))
+
+    script = TEMPLATE % code
+    out = subprocess.Popen([sys.executable, '-c', script], env = env,
+                           stdout = subprocess.PIPE).communicate()[0]
+    return float(out)
+
+if __name__ == '__main__':
+    for name, code in CASES:
+        best = min(timeit(code) for i in range(RUNS))
+        print '%-24s %8.1f ms' % (name, 1000.*best)
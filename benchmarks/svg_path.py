@@ -0,0 +1,97 @@
+#!python -u
+# -*- coding: utf-8 -*-
+"""
+SVG path data parser benchmark.
+
+Parses glyph outlines and long polylines with the token lexer
+(Path.iterparse) and the single regex parser (Path.parse), and
+checks that both give the same result, also for invalid and unusual
+path data. Run from the source folder:
+
+$ python benchmarks/svg_path.py
+"""
+import os
+import sys
+import math
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from svgplotlib.SVG.Path import parsePath
+
+RUNS = 5
+
+# path data where both parsers must fail the same way or agree
+EDGECASES = (
+    'M1 2 x',                           # unknown token
+    'x M1 2',
+    'M1\t2',                            # tab and CR are not separators
+    'M1 2\r\nL3 4',
+    '1 M1 2',                           # number before first command
+    'M1',                               # odd coordinate count
+    'M1 2 C1 2 3 4',
+    'M1 2 Z 3',
+    'H',
+    'A0 1 0 0 0 1 1',                   # first rx not positive
+    'A1 1 0 0 0 1 1 0 1 0 0 0 1 1',     # later rx is not checked
+    'A1 1 0 0 0 1 1 1 0 0 0 0 1 1',     # every ry is checked
+    'M1 e5',                            # bare exponent
+    '  ,M1 2',
+)
+
+def outcome(func, text):
+    'Result or exception type of parsing text'
+    try:
+        return list(func(text))
+    except Exception, e:
+        return type(e).__name__
+
+def glyph(n):
+    'Closed outline of n quadratic and cubic curves'
+    parts = ['M10.5,-3.25']
+    for i in range(n):
+        a = 2.*math.pi*i/n
+        x, y = 100.*math.cos(a), 100.*math.sin(a)
+        if i % 2:
+            parts.append('Q%.3f,%.3f %.3f,%.3f' % (x, y, x + 1.5, y - .5))
+        else:
+            parts.append('c%.3f %.3f %.3f %.3f %.3f %.3f' % (x, y, -y, x, 1e-3*x, -2.))
+    parts.append('Z')
+    return ' '.join(parts)
+
+def polyline(n):
+    'Line plot data with n points'
+    points = ' '.join('%.4f,%.4f' % (.1*i, 50.*math.sin(.01*i)) for i in range(n))
+    return 'M0,0 L' + points
+
+def timeit(func, text):
+    best = None
+    for i in range(RUNS):
+        t0 = time.time()
+        func(text)
+        t = time.time() - t0
+        if best is None or t < best:
+            best = t
+    return best
+
+if __name__ == '__main__':
+    lexer = lambda text: tuple(parsePath.iterparse(text))
+    
+    for text in EDGECASES:
+        expected = outcome(parsePath.iterparse, text)
+        assert outcome(parsePath.parse, text) == expected, text
+    print 'edge cases %d ok' % len(EDGECASES)
+    print
+    
+    print '%-20s %10s %10s %8s' % ('path', 'iterparse', 'parse', 'speedup')
+    for name, text in (
+            ('glyph 20', glyph(20)),
+            ('glyph 2000', glyph(2000)),
+            ('polyline 1000', polyline(1000)),
+            ('polyline 100000', polyline(100000)),
+        ):
+        assert list(lexer(text)) == parsePath.parse(text)
+        
+        t1 = timeit(lexer, text)
+        t2 = timeit(parsePath.parse, text)
+        print '%-20s %7.2f ms %7.2f ms %7.1fx' % (name, 1000.*t1, 1000.*t2, t1/t2)
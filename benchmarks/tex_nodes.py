@@ -0,0 +1,65 @@
+#!python -u
+# -*- coding: utf-8 -*-
+"""
+TEX box model memory and time benchmark.
+
+Parses the formula corpus from tex_parse.py many times, with the
+parse cache bypassed, and reports parse time together with node count
+and memory held by the resulting box trees. Run from the source folder:
+
+$ python benchmarks/tex_nodes.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from svgplotlib.TEX.Model import List
+from svgplotlib.TEX.Parser import Parser
+from svgplotlib.TEX.Font import BakomaFonts
+
+from tex_parse import CORPUS
+
+COPIES = 50
+
+def treeSize(box):
+    'Return number of nodes and bytes held by nodes'
+    count = size = 0
+    stack = [box]
+    while stack:
+        node = stack.pop()
+        count += 1
+        size += sys.getsizeof(node)
+        if hasattr(node, '__dict__'):
+            size += sys.getsizeof(node.__dict__)
+        if isinstance(node, List):
+            size += sys.getsizeof(node.children)
+            stack.extend(node.children)
+    return count, size
+
+if __name__ == '__main__':
+    parser = Parser()
+    fonts = BakomaFonts()
+
+    # warm up font loading
+    for text in CORPUS:
+        parser.parse(text, fonts, 24, 72)
+
+    trees = []
+    t0 = time.time()
+    for i in range(COPIES):
+        for text in CORPUS:
+            trees.append(parser.parse(text, fonts, 24, 72))
+    t = time.time() - t0
+
+    count = size = 0
+    for box in trees:
+        n, s = treeSize(box)
+        count += n
+        size += s
+
+    print 'formulas   %8d' % len(trees)
+    print 'parse time %8.2f ms/formula' % (1000.*t/len(trees))
+    print 'nodes      %8d' % count
+    print 'memory     %8.1f kB (%.0f bytes/node)' % (size/1024., float(size)/count)
@@ -0,0 +1,68 @@
+#!python -u
+# -*- coding: utf-8 -*-
+"""
+TEX parser benchmark.
+
+Parses a corpus of labels and formulas with the parse cache
+bypassed, with and without packrat memoization of the grammar.
+Run from the source folder:
+
+$ python benchmarks/tex_parse.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pyparsing import ParserElement
+
+from svgplotlib.TEX.Parser import Parser
+from svgplotlib.TEX.Font import BakomaFonts
+
+RUNS = 5
+
+CORPUS = (
+    'Time [ms]',
+    'Response time per request',
+    r'$\mu s$',
+    r'$\alpha_i > \beta_i$',
+    r'$x^2 + y^2 = r^2$',
+    r'$\sum_{i=0}^\infty x_i$',
+    r'$\sqrt{\frac{a}{b}}$',
+    r'$\frac{1}{\sqrt{x^{2}_{i} + y^{2}_{i}}}$',
+    r'$\sqrt{\frac{\sqrt{\frac{a^{b_{c}}}{d_{e^{f}}}}}{\frac{g}{h}}}$',
+    r'$\left(\frac{\frac{a}{b}}{\frac{c}{\sqrt[3]{d}}}\right)^{n_{k}}$',
+)
+
+def timeit(parser, fonts, text):
+    best = None
+    for i in range(RUNS):
+        t0 = time.time()
+        parser.parse(text, fonts, 24, 72)
+        t = time.time() - t0
+        if best is None or t < best:
+            best = t
+    return best
+
+def run(parser, fonts):
+    return [timeit(parser, fonts, text) for text in CORPUS]
+
+if __name__ == '__main__':
+    parser = Parser()
+    fonts = BakomaFonts()
+
+    # warm up font loading
+    run(parser, fonts)
+
+    packrat = run(parser, fonts)
+
+    # switch back to plain recursive descent
+    ParserElement._parse = ParserElement._parseNoCache
+    plain = run(parser, fonts)
+
+    print '%-60s %10s %10s' % ('expression', 'packrat', 'no packrat')
+    for text, t1, t2 in zip(CORPUS, packrat, plain):
+        print '%-60s %7.2f ms %7.2f ms' % (text, 1000.*t1, 1000.*t2)
+
+    print '%-60s %7.2f ms %7.2f ms' % ('worst case', 1000.*max(packrat), 1000.*max(plain))
@@ -0,0 +1,66 @@
+#!python -u
+# -*- coding: utf-8 -*-
+"""
+TEX box tree output benchmark.
+
+Ships wide and deeply nested box trees, built directly from the
+box model classes, to a renderer that only counts calls. Run from
+the source folder:
+
+$ python benchmarks/tex_ship.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from svgplotlib.TEX.Model import Hlist, Vlist, Kern, Box, ship
+
+RUNS = 5
+
+class CountRule(Box):
+    def render(self, renderer, x, y, w, h):
+        renderer.count += 1
+
+class CountRenderer:
+    count = 0
+
+def wide(n):
+    'Hlist of n small Vlists'
+    return Hlist([
+        Vlist([CountRule(1., 1., 1.), Kern(1.), CountRule(1., 1., 1.)])
+        for i in range(n)
+    ])
+
+def deep(n):
+    'Hlist and Vlist nested n levels'
+    box = Hlist([CountRule(1., 1., 1.)])
+    for i in range(n):
+        if i % 2:
+            box = Hlist([Kern(1.), box])
+        else:
+            box = Vlist([Kern(1.), box])
+    return Hlist([box])
+
+def timeit(box):
+    best = None
+    for i in range(RUNS):
+        renderer = CountRenderer()
+        t0 = time.time()
+        ship(renderer, 0, 0, box)
+        t = time.time() - t0
+        if best is None or t < best:
+            best = t
+    return best
+
+if __name__ == '__main__':
+    print 'recursion limit %d' % sys.getrecursionlimit()
+
+    for name, box in (
+            ('wide 1000', wide(1000)),
+            ('wide 100000', wide(100000)),
+            ('deep 100', deep(100)),
+            ('deep 10000', deep(10000)),
+        ):
+        print '%-16s %8.2f ms' % (name, 1000.*timeit(box))
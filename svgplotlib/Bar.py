@@ -117,11 +117,8 @@ class Bar(Base):
             dx += ylabelSize.height + ylabelSize.descent + 2*self.PAD
         
         # yaxis labels
-        maxSize = 0
-        for y in self.ymajorTicks:
-            s = u"%g" % y
-            size = self.textSize(s)
-            maxSize = max(maxSize, size.width)
+        ticklabels = self.tickLabels(self.ymajorTicks)
+        maxSize = max(size.width for s, size in ticklabels)
         dx += maxSize + self.PAD
         
         w += dx                 # side space
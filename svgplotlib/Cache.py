@@ -0,0 +1,61 @@
+#!python -u
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+class LRUCache(object):
+    '''
+    Dictionary like cache holding at most maxsize items.
+    When full, the least recently used item is dropped.
+    '''
+    def __init__(self, maxsize = 1024):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default = None):
+        data = self.data
+        try:
+            value = data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        # move to most recently used position
+        data[key] = value
+        self.hits += 1
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        data = self.data
+        if key in data:
+            del data[key]
+        elif len(data) >= self.maxsize:
+            data.popitem(last = False)
+
+        data[key] = value
+
+    def clear(self):
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
+
+if __name__ == '__main__':
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    cache.get('a')
+    cache['c'] = 3
+    print cache.data.keys()
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
-from os.path import join, abspath, dirname, expandvars
+from os.path import join, abspath, dirname, expandvars, expanduser
 from ConfigParser import SafeConfigParser
 
 # default font path
@@ -61,4 +61,9 @@ if config.has_option('fonts', 'size'):
     DEFAULTFONTSIZE = config.getint('fonts', 'size')
 else:
     DEFAULTFONTSIZE = 'Roman'
-    
\ No newline at end of file
+
+# on-disk font index, empty value disables the cache
+if config.has_option('fonts', 'fontindex'):
+    FONTINDEX = config.get('fonts', 'fontindex')
+else:
+    FONTINDEX = join(expanduser('~'), '.svgplotlib-fonts.cache')
@@ -0,0 +1,161 @@
+#!python -u
+# -*- coding: utf-8 -*-
+"""
+Point reduction for line plots with more samples than pixels.
+
+All functions work on plot area coordinates and return the indices
+of the points to keep, in the original order. The x values must be
+sorted in increasing order.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def isSorted(xpos):
+    '''
+    Check that x values are increasing
+    '''
+    if numpy is not None and isinstance(xpos, numpy.ndarray):
+        return not (numpy.diff(xpos) < 0.).any()
+
+    return all(a <= b for a, b in zip(xpos, xpos[1:]))
+
+def minmax(xpos, ypos, resolution = 1.):
+    '''
+    Keep the first, last, min and max point of each column of
+    width resolution. This preserves the visual extrema of
+    the line.
+    '''
+    n = min(len(xpos), len(ypos))
+
+    if numpy is not None and isinstance(xpos, numpy.ndarray):
+        xpos, ypos = xpos[:n], ypos[:n]
+        cols = numpy.floor(xpos / resolution).astype(int)
+
+        # column start indices
+        first = numpy.flatnonzero(numpy.diff(cols)) + 1
+        first = numpy.concatenate(([0], first))
+        last = numpy.concatenate((first[1:] - 1, [n - 1]))
+
+        # sorted on y within each column, first is min and last is max
+        order = numpy.lexsort((ypos, cols))
+        imin = order[first]
+        imax = order[last]
+
+        return numpy.unique(numpy.concatenate((first, last, imin, imax)))
+
+    indices = []
+    add = indices.extend
+
+    start = 0
+    col = None
+    imin = imax = 0
+    for i in xrange(n):
+        c = int(xpos[i] // resolution)
+        if c != col:
+            if col is not None:
+                add(sorted(set((start, i - 1, imin, imax))))
+            col = c
+            start = imin = imax = i
+
+        y = ypos[i]
+        if y < ypos[imin]:
+            imin = i
+        if y > ypos[imax]:
+            imax = i
+
+    if col is not None:
+        add(sorted(set((start, n - 1, imin, imax))))
+
+    return indices
+
+def lttb(xpos, ypos, threshold):
+    '''
+    Largest-Triangle-Three-Buckets downsampling to threshold points.
+
+    The points are divided into threshold - 2 buckets and from each
+    bucket the point forming the largest triangle with the previous
+    selected point and the average of the next bucket is kept.
+    '''
+    n = min(len(xpos), len(ypos))
+    threshold = int(threshold)
+
+    if threshold >= n or threshold < 3:
+        return range(n)
+
+    every = (n - 2) / float(threshold - 2)
+
+    usenumpy = numpy is not None and isinstance(xpos, numpy.ndarray)
+
+    a = 0
+    indices = [0]
+    for i in xrange(threshold - 2):
+        # average point of next bucket
+        start = int((i + 1)*every) + 1
+        end = min(int((i + 2)*every) + 1, n)
+
+        # range of current bucket
+        rstart = int(i*every) + 1
+        rend = int((i + 1)*every) + 1
+
+        ax, ay = xpos[a], ypos[a]
+
+        if usenumpy:
+            avgx = xpos[start:end].mean()
+            avgy = ypos[start:end].mean()
+
+            area = numpy.abs((ax - avgx)*(ypos[rstart:rend] - ay) -
+                             (ax - xpos[rstart:rend])*(avgy - ay))
+            a = rstart + int(area.argmax())
+        else:
+            count = float(end - start)
+            avgx = sum(xpos[start:end]) / count
+            avgy = sum(ypos[start:end]) / count
+
+            best = -1.
+            for j in xrange(rstart, rend):
+                area = abs((ax - avgx)*(ypos[j] - ay) - (ax - xpos[j])*(avgy - ay))
+                if area > best:
+                    best = area
+                    a = j
+
+        indices.append(a)
+
+    indices.append(n - 1)
+
+    return indices
+
+def downsample(xpos, ypos, width, method = 'minmax'):
+    '''
+    Reduce points to what a plot of the given width can show.
+    Returns new xpos, ypos. Unsorted x data is returned unchanged.
+    '''
+    if method not in ('minmax', 'lttb'):
+        raise ValueError("Unknown downsample method '%s'" % method)
+
+    n = min(len(xpos), len(ypos))
+    if n <= 2*width or not isSorted(xpos):
+        return xpos, ypos
+
+    if method == 'minmax':
+        indices = minmax(xpos, ypos)
+    else:
+        indices = lttb(xpos, ypos, 2*width)
+
+    if numpy is not None and isinstance(xpos, numpy.ndarray):
+        return xpos[indices], ypos[indices]
+
+    return [xpos[i] for i in indices], [ypos[i] for i in indices]
+
+if __name__ == '__main__':
+    import math
+
+    xpos = [.01*i for i in range(100000)]
+    ypos = [math.sin(x) for x in xpos]
+
+    x, y = downsample(xpos, ypos, 500)
+    print 'minmax', len(x)
+
+    x, y = downsample(xpos, ypos, 500, 'lttb')
+    print 'lttb', len(x)
@@ -3,8 +3,87 @@
 import sys
 import datetime
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from svgplotlib import Base
 from svgplotlib.TEX import isTEX
+from svgplotlib.Downsample import downsample as reducePoints
+
+def limits(data):
+    '''
+    Return min and max value of data
+    '''
+    if numpy is not None and isinstance(data, numpy.ndarray):
+        return data.min(), data.max()
+    
+    return min(data), max(data)
+
+def pathData(xpos, ypos, cmd = 'M'):
+    '''
+    Format coordinates as SVG path data 'M x0,y0 L x1,y1 ...'.
+    
+    All points are formatted with a single string formatting
+    operation instead of one per point.
+    '''
+    n = min(len(xpos), len(ypos))
+    if n == 0:
+        return ''
+    
+    if numpy is not None and isinstance(xpos, numpy.ndarray):
+        coords = numpy.empty(2*n)
+        coords[0::2] = xpos[:n]
+        coords[1::2] = ypos[:n]
+        coords = coords.tolist()
+    else:
+        coords = [None]*(2*n)
+        coords[0::2] = xpos[:n]
+        coords[1::2] = ypos[:n]
+    
+    fmt = cmd + ' %g,%g' + ' L %g,%g'*(n - 1)
+    return fmt % tuple(coords)
+
+def markerShape(marker, size):
+    '''
+    Return start offset and relative path data for a marker
+    centered on the origin.
+    '''
+    r = .5*size
+    if marker == 'circle':
+        return -r, 0., 'a %g,%g 0 1,0 %g,0 a %g,%g 0 1,0 %g,0 z' % (r, r, size, r, r, -size)
+    elif marker == 'square':
+        return -r, -r, 'h %g v %g h %g z' % (size, size, -size)
+    elif marker == 'diamond':
+        return 0., -r, 'l %g,%g l %g,%g l %g,%g z' % (r, r, -r, r, -r, -r)
+    elif marker == 'triangle':
+        return 0., -r, 'l %g,%g h %g z' % (r, size, -size)
+    
+    raise ValueError("Unknown marker '%s'" % marker)
+
+def markerData(xpos, ypos, marker, size):
+    '''
+    Format markers at all points as a single SVG path data string.
+    '''
+    n = min(len(xpos), len(ypos))
+    if n == 0:
+        return ''
+    
+    dx, dy, shape = markerShape(marker, size)
+    
+    if numpy is not None and isinstance(xpos, numpy.ndarray):
+        coords = numpy.empty(2*n)
+        coords[0::2] = xpos[:n] + dx
+        coords[1::2] = ypos[:n] + dy
+        coords = coords.tolist()
+    else:
+        coords = [None]*(2*n)
+        coords[0::2] = [x + dx for x in xpos[:n]]
+        coords[1::2] = [y + dy for y in ypos[:n]]
+    
+    fmt = ' '.join(('M %g,%g ' + shape,)*n)
+    return fmt % tuple(coords)
 
 class Graph(Base):
     """
@@ -53,6 +132,9 @@ class Graph(Base):
             'stroke'        : 'none',
         }
         
+        # marker symbols in defs section
+        self.markers = {}
+        
         # get data
         if len(args) == 1:
             self.ydata = args[0]
@@ -79,8 +161,7 @@ class Graph(Base):
         maxMinSteps = kwargs.get('maxMinSteps', 2)
         
         # build xticks
-        minx = min(self.xdata)
-        maxx = max(self.xdata)
+        minx, maxx = limits(self.xdata)
         
         if minx == maxx:
             minx -= 1
@@ -90,8 +171,7 @@ class Graph(Base):
         self.xmajorTicks, self.xminorTicks = x1, x2
         
         # build yticks
-        miny = min(self.ydata)
-        maxy = max(self.ydata)
+        miny, maxy = limits(self.ydata)
         
         if miny == maxy:
             miny -= 1
@@ -159,11 +239,8 @@ class Graph(Base):
             dx += ylabelSize.height + ylabelSize.descent + 2*self.PAD
         
         # yaxis labels
-        maxSize = 0
-        for y in self.ymajorTicks:
-            s = u"%g" % y
-            size = self.textSize(s)
-            maxSize = max(maxSize, size.width)
+        labels = self.tickLabels(self.ymajorTicks, kwargs.get('yfmt'))
+        maxSize = max(size.width for s, size in labels)
         dx += maxSize + self.PAD
         
         w += dx                 # side space
@@ -221,34 +298,92 @@ class Graph(Base):
         if grid:
             self.grid()
     
-    def drawLines(self, xdata = None, ydata = None, color = 'black', **kwargs):
+    def transform(self, xdata, ydata):
+        '''
+        Map data to plot area coordinates. With numpy available
+        this is done with array operations and arrays are returned,
+        otherwise lists.
+        '''
         xscale, yscale = self.xscale, self.yscale
+        minx, miny = self.minx, self.miny
         height = self.plotHeight
         
+        if numpy is not None:
+            xpos = (numpy.asarray(xdata, dtype = float) - minx)*xscale
+            ypos = height - (numpy.asarray(ydata, dtype = float) - miny)*yscale
+        else:
+            xpos = [(x - minx)*xscale for x in xdata]
+            ypos = [height - (y - miny)*yscale for y in ydata]
+        
+        return xpos, ypos
+        
+    def drawLines(self, xdata = None, ydata = None, color = 'black',
+                  downsample = None, **kwargs):
+        '''
+        Draw data as a line. If downsample is 'minmax' or 'lttb' the
+        points are reduced to what the plot width can show.
+        '''
+        if xdata is None:
+            xdata = self.xdata
+        
+        if ydata is None:
+            ydata = self.ydata
+        
+        xpos, ypos = self.transform(xdata, ydata)
+        if downsample:
+            xpos, ypos = reducePoints(xpos, ypos, self.plotWidth, downsample)
+        
+        path_data = pathData(xpos, ypos)
+        if not path_data:
+            return
+        
+        self.plotArea.Path(d = path_data, fill = 'none', stroke = color, **kwargs)
+    
+    def markerId(self, marker, size):
+        '''
+        Return id of marker symbol, adding it to
+        the defs section on first use.
+        '''
+        markers = self.markers
+        key = marker, size
+        if not key in markers:
+            dx, dy, shape = markerShape(marker, size)
+            name = 'marker-%s-%d' % (marker, len(markers))
+            self.defs.Path(id = name, d = 'M %g,%g %s' % (dx, dy, shape))
+            markers[key] = name
+        
+        return markers[key]
+    
+    def drawMarkers(self, xdata = None, ydata = None, color = 'black',
+                    marker = 'circle', size = 6, maxMarkers = 5000, **kwargs):
+        '''
+        Draw a marker at each data point. The marker is defined once
+        and placed with <use> elements. Above maxMarkers points all
+        markers are drawn as a single path instead.
+        '''
         if xdata is None:
             xdata = self.xdata
         
         if ydata is None:
             ydata = self.ydata
-            
-        path_data = []
-        add = path_data.append
         
-        x = xdata[0] - self.minx
-        y = ydata[0] - self.miny
+        xpos, ypos = self.transform(xdata, ydata)
         
-        add('M %g,%g' % (x*xscale, height - y*yscale))
+        n = min(len(xpos), len(ypos))
+        if n == 0:
+            return
         
-        for x, y in zip(xdata[1:], ydata[1:]):
-            x = x - self.minx
-            y = y - self.miny
-            add('L %g,%g' % (x*xscale, height - y*yscale))
+        if n > maxMarkers:
+            self.plotArea.Path(d = markerData(xpos, ypos, marker, size),
+                               fill = color, stroke = 'none', **kwargs)
+            return
         
-        self.plotArea.Path(d = ' '.join(path_data), fill = 'none', stroke = color, **kwargs)
+        href = '#' + self.markerId(marker, size)
+        g = self.plotArea.Group(fill = color, stroke = 'none', **kwargs)
+        g.Uses(x = xpos[:n], y = ypos[:n], **{'xlink:href' : href})
     
-    def drawArea(self, xdata = None, ydata = None, fill = 'steelblue',  opacity = .5, **kwargs):
-        xscale = self.xscale
-        yscale = self.yscale
+    def drawArea(self, xdata = None, ydata = None, fill = 'steelblue',  opacity = .5,
+                 downsample = None, **kwargs):
         plotHeight = self.plotHeight
         
         if xdata is None:
@@ -256,26 +391,27 @@ class Graph(Base):
         
         if ydata is None:
             ydata = self.ydata
-            
+        
+        xpos, ypos = self.transform(xdata, ydata)
+        if downsample:
+            xpos, ypos = reducePoints(xpos, ypos, self.plotWidth, downsample)
+        
+        n = min(len(xpos), len(ypos))
+        if n == 0:
+            return
+        
         path_data = []
         add = path_data.append
         
-        x = self.xdata[0] - self.minx
-        y = self.ydata[0] - self.miny
-        
-        if y > self.miny:
-            add('M %g,%g' % (x*xscale, plotHeight - self.miny*yscale))
-            add('L %g,%g' % (x*xscale, plotHeight - y*yscale))
+        # close area against the bottom of the plot
+        if ypos[0] < plotHeight:
+            add('M %g,%g' % (xpos[0], plotHeight))
+            add(pathData(xpos, ypos, 'L'))
         else:
-            add('M %g,%g' % (x*xscale, plotHeight - y*yscale))
-        
-        for x, y in zip(self.xdata[1:], self.ydata[1:]):
-            x = x - self.minx
-            y = y - self.miny
-            add('L %g,%g' % (x*xscale, plotHeight - y*yscale))
+            add(pathData(xpos, ypos, 'M'))
         
-        if y > self.miny:
-            add('L %g,%g' % (x*xscale, plotHeight))
+        if ypos[n - 1] < plotHeight:
+            add('L %g,%g' % (xpos[n - 1], plotHeight))
             
         add('Z')
         
@@ -287,6 +423,9 @@ class LineGraph(Graph):
     """
     Simple line graph
     
+    Pass downsample = 'minmax' or 'lttb' to reduce data sets with
+    more points than the plot width can show.
+    
     Example::
         >>> graph = LineGraph(
         ...    (0,10,20),(0,50,25),
@@ -305,7 +444,7 @@ class LineGraph(Graph):
         color = kwargs.get('color', 'blue')
         
         # plot graph
-        self.drawLines(color = color)
+        self.drawLines(color = color, downsample = kwargs.get('downsample'))
         
 
 class AreaGraph(LineGraph):
@@ -332,6 +471,38 @@ class AreaGraph(LineGraph):
         self.drawArea(**kwargs)
 
 
+class ScatterGraph(Graph):
+    """
+    Simple scatter graph
+    
+    Markers can be 'circle', 'square', 'diamond' or 'triangle'.
+    With more than maxMarkers points, the markers are drawn
+    as a single path.
+    
+    Example::
+        >>> graph = ScatterGraph(
+        ...    (0,10,20),(0,50,25),
+        ...    width = 1000, height = 500,
+        ...    title = 'Simple plot',
+        ...    xlabel = 'X axis',
+        ...    ylabel = 'Y axis',
+        ...    marker = 'diamond',
+        ...    markerSize = 8,
+        ... )
+        >>> 
+    """
+    def __init__(self, *args, **kwargs):
+        super(ScatterGraph,self).__init__(*args,**kwargs)
+        
+        # plot markers
+        self.drawMarkers(
+            color = kwargs.get('color', 'blue'),
+            marker = kwargs.get('marker', 'circle'),
+            size = kwargs.get('markerSize', 6),
+            maxMarkers = kwargs.get('maxMarkers', 5000),
+        )
+
+
 class DateGraph(Graph):
     """
     Base class for date plots. For now only month scale
@@ -412,7 +583,7 @@ class DateMonthGraph(DateGraph):
         
         # plot graph
         color = kwargs.get('color', 'blue')
-        self.drawLines(color = color)
+        self.drawLines(color = color, downsample = kwargs.get('downsample'))
         
 if __name__ == '__main__':
     from svgplotlib.SVG import show
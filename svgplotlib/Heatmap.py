@@ -1,13 +1,34 @@
 
 
 from svgplotlib import SVG, Base
+from svgplotlib.PNG import encodePNG, dataURI
+from svgplotlib.SVG import serialize
 
 import itertools
+from bisect import bisect_left
 import math
 import re
 import sys
 import xml.etree.cElementTree as ET
 import xml.etree.ElementTree as etree
+from cStringIO import StringIO
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def cell_runs( row ):
+    """Yield (start, length, value) for runs of equal values in row"""
+    start = 0
+    n = len(row)
+    while start < n:
+        value = row[start]
+        end = start + 1
+        while end < n and row[end] == value:
+            end += 1
+        yield start, end - start, value
+        start = end
 
 
 class Heatmap(Base):
@@ -32,11 +53,17 @@ class Heatmap(Base):
     ## LEGEND attributes
     leght  = 20 # height
     legwd  = 10  # width
+    ## STREAMING attributes
+    rows   = None  # iterator of rows, see from_rows
+    rows_written = False
+    rows_marker = '<g id="rows" />'
 
     def __init__(self, matrix, xlabels=None, ylabels=None,
                        width=None, height=None,
                        xpad=0, ypad=0,
                        n_groups=None,
+                       raster_cells=250000,
+                       merge=None,
                        **kwargs ):
         """
         >>> matrix = [ [0,1,2], [2,1,0] ]
@@ -84,6 +111,14 @@ class Heatmap(Base):
         self.matrix = matrix
         self.save_labels(xlabels, ylabels)
         self.n_groups = n_groups 
+        ## above this cell count cells are drawn as an image, None disables.
+        ## Not used when merge is given.
+        self.raster_cells = raster_cells
+        ## 'rows' merges equal coloured runs of cells, 'blocks' also
+        ## merges them across rows
+        if merge not in (None, 'rows', 'blocks'):
+            raise ValueError( "merge must be None, 'rows' or 'blocks', got {0!r}".format(merge) )
+        self.merge = merge
         self.styles  = { 
                          '#xlabels'  : { 'width'   : self.leght ,
                                          'height'  : self.yscale },
@@ -101,6 +136,32 @@ class Heatmap(Base):
             styles.update( self.styles )
     
         #self.transform_script()
+    @classmethod
+    def from_rows( cls, rows, xlabels, ylabels, **kwargs ):
+        """Streaming constructor. rows is an iterator giving the
+        values of one row, i.e. one per xlabel, for each ylabel.
+        Rows are coloured and written one at a time by write, so
+        they never all have to be in memory.
+
+        Cells are drawn as with the normal constructor, but never
+        as an image or merged, as that needs all rows at once, so
+        raster_cells and merge can not be given. The rows are used
+        up by write, so the heatmap can only be written once.
+
+        >>> rows = iter( [ [0,2], [1,1], [2,0] ] )
+        >>> heat = Heatmap.from_rows( rows, ['a','b'], ['1','2','3'] )
+        >>> heat.set_colours( 0, 1, 2 )
+        >>> heat.draw()
+        >>> heat.write( sys.stdout )
+        """
+        for name in ('raster_cells', 'merge'):
+            if kwargs.get(name) is not None:
+                raise ValueError( "{0} is not supported for streamed heatmaps".format(name) )
+        kwargs.update( raster_cells=None, merge=None )
+        heat = cls( None, xlabels, ylabels, **kwargs )
+        heat.rows = iter( rows )
+        return heat
+
     hexed = re.compile( '([0-9a-fA-F]{2})' )
     def set_style( self, **attrib ):
         """Sets any number of style options to be written to the SVG at
@@ -115,7 +176,7 @@ class Heatmap(Base):
             else:
                 self.styles.update( { key : value } )
 
-    def set_colours( self, minlim, mid, maxlim ):
+    def set_colours( self, minlim, mid, maxlim, n_colours=256 ):
         """Factory method. Returns a colour generator that can be
         used to generate an RGB hex colour from a value in the
         range minlim - maxlim. Values that are equal to mid
@@ -125,8 +186,16 @@ class Heatmap(Base):
 
         Before returning, self.heat_color is replaced with
         the colour generator, so there's no need to keep hold
-        of the returned function.
+        of the returned function. self.heat_colors is replaced
+        with a function colouring a whole matrix from a table
+        of n_colours colours. n_colours must be at least 2, and
+        minlim and maxlim must differ.
         """
+        if n_colours < 2:
+            raise ValueError( "n_colours must be at least 2, got {0}".format(n_colours) )
+        if maxlim == minlim:
+            raise ValueError( "minlim and maxlim must differ, got {0}".format(minlim) )
+
         self.min = minlim
         self.mid = mid
         self.max = maxlim
@@ -152,18 +221,59 @@ class Heatmap(Base):
         lownorm = minlim  - mid
         _lownorm= 1./lownorm
 
-        def colorgen( value ):
-            """value must be within the range min - max, as given
-            to set_colours"""
+        def rgbgen( value ):
+            """RGB values of colour for value"""
             if value == mid:
-                rgb = nothing
+                return nothing
             elif value > mid:
                 nval = value * _upnorm
-                rgb  = [ int(nval*c) for c in hotnorm ]
+                return [ int(nval*c) for c in hotnorm ]
             else:
                 nval = value * _lownorm
-                rgb  = [ int(nval*c) for c in coldnorm ]
-            return '#{0:02X}{1:02X}{2:02X}'.format(*rgb)
+                return [ int(nval*c) for c in coldnorm ]
+
+        def colorgen( value ):
+            """value must be within the range min - max, as given
+            to set_colours"""
+            return '#{0:02X}{1:02X}{2:02X}'.format(*rgbgen(value))
+
+        ## Lookup table of n_colours colours spanning minlim - maxlim,
+        ## with the 'nothing' colour for mid as the extra last entry.
+        ## rgb_table holds the same colours as 3 byte strings.
+        last    = int(n_colours) - 1
+        _step   = last / float(maxlim - minlim)
+        levels  = [ minlim + i/_step for i in range(last + 1) ] + [ mid ]
+        table   = map( colorgen, levels )
+        self.colour_table = table
+        def rgbbytes( value ):
+            """Colour for value as a 3 byte string"""
+            return ''.join( chr(min(max(c, 0), 255)) for c in rgbgen(value) )
+        self.rgb_table = map( rgbbytes, levels )
+
+        def colourindex( rows ):
+            """Index in colour table for all values in rows, quantized
+            to the nearest colour. rows is indexed [y][x]."""
+            if numpy is not None:
+                values = numpy.asarray( rows, dtype=float )
+                index  = numpy.rint( (values - minlim) * _step ).astype(int)
+                numpy.clip( index, 0, last, out=index )
+                index[values == mid] = last + 1
+                return index
+            def lookup( value ):
+                if value == mid:
+                    return last + 1
+                return min(max(int(round((value - minlim) * _step)), 0), last)
+            return [ map(lookup, row) for row in rows ]
+
+        def colourgrid( matrix ):
+            """Colours for all values in matrix, quantized to the
+            nearest entry in the colour table. Returns a list of
+            rows, i.e. indexed [y][x] for a matrix indexed [x][y]."""
+            if numpy is not None:
+                index = colourindex( numpy.asarray( matrix, dtype=float ).T )
+                return numpy.array( table, dtype=object )[index].tolist()
+            return [ [ table[i] for i in row ]
+                     for row in colourindex( zip(*matrix) ) ]
 
         if self.n_groups is not None:
             def RGB( rgb_list ):
@@ -175,19 +285,25 @@ class Heatmap(Base):
                 colours = []
                 while cur <= maxlim and cur >= minlim:
                     id = '{0}{1}'.format(prefix,i)
-                    self.defs.Rect( id=id, fill=colorgen(cur),
+                    fill = group_fills['#' + id] = colorgen(cur)
+                    group_rgb['#' + id] = rgbbytes(cur)
+                    self.defs.Rect( id=id, fill=fill,
                                     width=self.xscale, height=self.yscale )
                     colours.append(cur)
                     cur += group_diff
                     i   += 1
                 id = '{0}{1}'.format(prefix,i)
-                self.defs.Rect( id=id, fill=colorgen(cur),
+                fill = group_fills['#' + id] = colorgen(cur)
+                group_rgb['#' + id] = rgbbytes(cur)
+                self.defs.Rect( id=id, fill=fill,
                                 width=self.xscale, height=self.yscale )
                 colours.append(cur)
                 return colours
 
             ## half the groups in cold_groups, other half in hot_groups
             colour_groups = {}
+            group_fills = self.group_fills = { '#0' : RGB(nothing) }
+            group_rgb   = self.group_rgb   = { '#0' : rgbbytes(mid) }
             cold_gdiff = _lownorm * .5 / self.n_groups
             hot_gdiff  = _upnorm  * .5 / self.n_groups
             self.defs.Rect( id='0', fill = RGB(nothing),
@@ -196,25 +312,44 @@ class Heatmap(Base):
             colour_groups.update( { 'cold' : gen_groups(cold_gdiff, prefix='c') } )
             colour_groups.update( { 'hot'  : gen_groups(hot_gdiff , prefix='h') } )
 
+            ## Group boundaries in increasing order for binary search.
+            ## Cold boundaries decrease, so they are searched negated.
+            hot       = colour_groups['hot']
+            coldneg   = [ -value for value in colour_groups['cold'] ]
+            hot_ids   = [ '#h{0}'.format(i) for i in range(len(hot)) ]
+            cold_ids  = [ '#c{0}'.format(i) for i in range(len(coldneg)) ]
+            hot_last  = len(hot) - 1
+            cold_last = len(coldneg) - 1
+
         def IDgen( value ):
             """ Alternate colour generator that returns id's, referencing a
             rect in the SVG's defs section."""
-            i = 0
             if value == mid:
-                id = '#0'
+                return '#0'
             elif value < mid:
-                cold = colour_groups['cold']
-                while value < cold[i]:
-                    i += 1
-                id = '#c{0}'.format(i)
+                return cold_ids[ min(bisect_left(coldneg, -value), cold_last) ]
             else: # value > mid
-                hot = colour_groups['hot']
-                while value > hot[i]:
-                    i += 1
-                id = '#h{0}'.format(i)
-            return id
-        self.heat_ID    = IDgen
-        self.heat_color = colorgen
+                return hot_ids[ min(bisect_left(hot, value), hot_last) ]
+
+        def IDgrid( matrix ):
+            """ id's for all values in matrix, as a list of rows like
+            colourgrid."""
+            if numpy is not None:
+                values = numpy.asarray( matrix, dtype=float ).T
+                hot_i  = numpy.searchsorted( hot, values ).clip( 0, hot_last )
+                cold_i = numpy.searchsorted( coldneg, -values ).clip( 0, cold_last )
+                ids    = numpy.where( values < mid,
+                                      numpy.array( cold_ids, dtype=object )[cold_i],
+                                      numpy.array( hot_ids, dtype=object )[hot_i] )
+                ids[values == mid] = '#0'
+                return ids.tolist()
+            return [ map(IDgen, row) for row in zip(*matrix) ]
+
+        self.heat_ID     = IDgen
+        self.heat_IDs    = IDgrid
+        self.heat_color  = colorgen
+        self.heat_colors = colourgrid
+        self.heat_index  = colourindex
         return colorgen
 
     def draw(self):
@@ -231,21 +366,156 @@ class Heatmap(Base):
         map( self.set_xlabel, enumerate(xlabels) )
         set_ylabel = self.set_ylabel
 
-        if self.n_groups is not None:
-            make_rect = self.use_rect
-        else:
-            make_rect = self.make_rect
         yshift = self.yscale + self.ypad
 
-        for y,ylabel in enumerate( self.ylabels ):
-            r = self.r = g.Group(transform="translate(0,{0:.0f})".format(y*yshift) )
-            r.set('class','row')
-            set_ylabel( (y,ylabel) )
-            ylab = ((y,ylabel,),) * n_x
-            map( make_rect, enumerate(xlabels), ylab )
+        if self.rows is not None:
+            ## rows are drawn while writing, see write_rows
+            g.Group( id='rows' )
+        elif self.merge is None and self.raster_cells is not None \
+                and n_x * n_y > self.raster_cells:
+            ## cells as one image, rows only hold their labels
+            self.draw_raster( g, n_x, n_y )
+            for y,ylabel in enumerate( self.ylabels ):
+                r = self.r = g.Group(transform="translate(0,{0:.0f})".format(y*yshift) )
+                r.set('class','row')
+                set_ylabel( (y,ylabel) )
+        elif self.merge is not None:
+            ## cells merged into larger rects, rows only hold their labels
+            self.draw_merged( g, n_x, n_y )
+            for y,ylabel in enumerate( self.ylabels ):
+                r = self.r = g.Group(transform="translate(0,{0:.0f})".format(y*yshift) )
+                r.set('class','row')
+                set_ylabel( (y,ylabel) )
+        elif self.n_groups is not None:
+            ## look up all cell groups at once, and add each row in one call
+            hrefs = self.heat_IDs( self.matrix )
+            transforms = [ "translate({0},0)".format(x * (self.xscale + self.xpad))
+                           for x in range(n_x) ]
+            for y,ylabel in enumerate( self.ylabels ):
+                r = self.r = g.Group(transform="translate(0,{0:.0f})".format(y*yshift) )
+                r.set('class','row')
+                set_ylabel( (y,ylabel) )
+                r.Uses( transform=transforms, **{ 'xlink:href' : hrefs[y][:n_x] } )
+        else:
+            ## colour all cells at once, and add each row in one call
+            fills = self.heat_colors( self.matrix )
+            transforms = [ "translate({0},{1})".format(x*self.xscale + x*self.xpad, 0)
+                           for x in range(n_x) ]
+            width  = self.xscale + self.xpad
+            height = self.yscale + self.ypad
+            for y,ylabel in enumerate( self.ylabels ):
+                r = self.r = g.Group(transform="translate(0,{0:.0f})".format(y*yshift) )
+                r.set('class','row')
+                set_ylabel( (y,ylabel) )
+                r.Rects( width=width, height=height,
+                         fill=fills[y][:n_x], transform=transforms )
         self.draw_legend()
         return
 
+    def draw_row( self, parent, y, ylabel, values ):
+        """Draw row y of a streamed heatmap as a group appended to
+        parent. Returns the group."""
+        n_x = len( self.xlabels )
+        xpitch = self.xscale + self.xpad
+        transforms = [ "translate({0},0)".format(x * xpitch) for x in range(n_x) ]
+
+        r = self.r = self.Group( parent=parent,
+            transform="translate(0,{0:.0f})".format(y * (self.yscale + self.ypad)) )
+        r.set('class','row')
+        self.set_ylabel( (y,ylabel) )
+        if self.n_groups is not None:
+            hrefs = map( self.heat_ID, values[:n_x] )
+            r.Uses( transform=transforms, **{ 'xlink:href' : hrefs } )
+        else:
+            table = self.colour_table
+            fills = [ table[i] for i in self.heat_index( [ values[:n_x] ] )[0] ]
+            r.Rects( width=xpitch, height=self.yscale + self.ypad,
+                     fill=fills, transform=transforms )
+        return r
+
+    def write_rows( self, file, encoding='utf-8' ):
+        """Draw and write each remaining row of a streamed heatmap
+        to file, keeping only one row in memory at a time."""
+        self.rows_written = True
+        holder = ET.Element( 'g' )
+        for y, (ylabel, values) in enumerate( itertools.izip( self.ylabels, self.rows ) ):
+            r = self.draw_row( holder, y, ylabel, values )
+            serialize( file, r.element, encoding, 'svg' )
+            holder.remove( r.element )
+
+    def draw_merged( self, g, n_x, n_y ):
+        """Draw runs of equally coloured cells in a row as one rect.
+        With merge='blocks' runs with the same position and colour
+        in following rows are merged into one rect as well.
+        Cells are not merged across the gaps left by xpad or ypad
+        in grouped mode, so the padding stays visible."""
+        xpitch = self.xscale + self.xpad
+        ypitch = self.yscale + self.ypad
+        if self.n_groups is not None:
+            ## group colours, drawn without padding like the defs rects
+            group_fills = self.group_fills
+            rows  = [ [ group_fills[id] for id in row ]
+                      for row in self.heat_IDs( self.matrix ) ]
+            cellw, cellh = self.xscale, self.yscale
+        else:
+            rows  = self.heat_colors( self.matrix )
+            cellw, cellh = xpitch, ypitch
+
+        ## only merge where neighbouring cells touch
+        merge_x = cellw == xpitch
+        blocks  = self.merge == 'blocks' and cellh == ypitch
+        rects  = []     # [x, y, columns, rows, fill]
+        above  = {}     # (x, columns, fill) -> rect ending in previous row
+        for y, row in enumerate( rows[:n_y] ):
+            current = {}
+            if merge_x:
+                runs = cell_runs( row[:n_x] )
+            else:
+                runs = [ (x, 1, fill) for x, fill in enumerate( row[:n_x] ) ]
+            for x, n, fill in runs:
+                key  = (x, n, fill)
+                rect = above.get( key )
+                if rect is not None and blocks:
+                    rect[3] += 1
+                else:
+                    rect = [ x, y, n, 1, fill ]
+                    rects.append( rect )
+                current[key] = rect
+            above = current
+
+        cells = g.Group( id='cells' )
+        cells.Rects( x      = [ rect[0]*xpitch for rect in rects ],
+                     y      = [ rect[1]*ypitch for rect in rects ],
+                     width  = [ (rect[2] - 1)*xpitch + cellw for rect in rects ],
+                     height = [ (rect[3] - 1)*ypitch + cellh for rect in rects ],
+                     fill   = [ rect[4] for rect in rects ] )
+
+    def draw_raster( self, g, n_x, n_y ):
+        """Draw the cells as an embedded PNG image with one pixel
+        per cell, scaled to the heatmap area. Colours come from
+        the colour table, or the group colours in grouped mode."""
+        if self.n_groups is not None:
+            group_rgb = self.group_rgb
+            data = [ ''.join( [ group_rgb[id] for id in row[:n_x] ] )
+                     for row in self.heat_IDs( self.matrix )[:n_y] ]
+        elif numpy is not None:
+            rows  = numpy.asarray( self.matrix, dtype=float ).T
+            index = self.heat_index( rows )
+            rgb  = numpy.fromstring( ''.join(self.rgb_table), dtype=numpy.uint8 ).reshape(-1, 3)
+            data = [ row.tostring() for row in rgb[index[:n_y, :n_x]].reshape(n_y, -1) ]
+        else:
+            index = self.heat_index( zip(*self.matrix) )
+            rgb_table = self.rgb_table
+            data = [ ''.join( [ rgb_table[i] for i in row[:n_x] ] ) for row in index[:n_y] ]
+
+        png = encodePNG( n_x, n_y, data )
+        g.Image( x=0, y=0,
+                 width  = n_x * (self.xscale + self.xpad),
+                 height = n_y * (self.yscale + self.ypad),
+                 preserveAspectRatio = 'none',
+                 image_rendering = 'optimizeSpeed',
+                 **{ 'xlink:href' : dataURI(png) } )
+
     def draw_box( self, xlabel_ylabel ):
         xlabel, ylabel = xlabel_ylabel
         xind, xlabel = xlabel
@@ -308,6 +578,12 @@ class Heatmap(Base):
     def heat_ID(self,value):
         print "Run {0}.set_colours() first".format( self.__class__.__name__ )
 
+    def heat_colors(self,matrix):
+        print "Run {0}.set_colours() first".format( self.__class__.__name__ )
+
+    def heat_IDs(self,matrix):
+        print "Run {0}.set_colours() first".format( self.__class__.__name__ )
+
     def transform_script(self):
         js = u"""
 window.onload = function() {{
@@ -399,7 +675,24 @@ function adjustXLabel() {{
         return node.element
 
     def write(self, file=sys.stdout, header=True, encoding='utf-8', **kwargs):
-        return super(Heatmap,self).write(file=file, header=header, encoding=encoding, method='svg')
+        if self.rows is None:
+            return super(Heatmap,self).write(file=file, header=header, encoding=encoding, method='svg')
+
+        if self.rows_written:
+            raise ValueError( "rows of a streamed heatmap can only be written once" )
+
+        if isinstance(file, basestring):
+            with open(file, 'wb') as handle:
+                return self.write(handle, header, encoding)
+
+        ## write the document without cells, with the rows streamed
+        ## in place of the empty marker group added by draw
+        document = StringIO()
+        super(Heatmap,self).write(file=document, header=header, encoding=encoding, method='svg')
+        head, tail = document.getvalue().split( self.rows_marker, 1 )
+        file.write( head )
+        self.write_rows( file, encoding )
+        file.write( tail )
 
 
 _encode = etree._encode
@@ -0,0 +1,43 @@
+#!python -u
+# -*- coding: utf-8 -*-
+"""
+Minimal PNG encoder for embedding raster data in SVG documents.
+"""
+import struct
+import zlib
+import base64
+
+def chunk(tag, data):
+    '''
+    Return PNG chunk with length and crc
+    '''
+    crc = zlib.crc32(tag + data) & 0xffffffff
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', crc)
+
+def encodePNG(width, height, rows, level = 6):
+    '''
+    Encode 8 bit RGB image as PNG. rows is a sequence of height
+    strings each holding 3*width bytes.
+    '''
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+
+    # each scanline starts with filter type 0 (none)
+    raw = '\x00' + '\x00'.join(rows)
+
+    return ''.join((
+        '\x89PNG\r\n\x1a\n',
+        chunk('IHDR', header),
+        chunk('IDAT', zlib.compress(raw, level)),
+        chunk('IEND', ''),
+    ))
+
+def dataURI(png):
+    '''
+    Return PNG data as data URI for use in xlink:href
+    '''
+    return 'data:image/png;base64,' + base64.b64encode(png)
+
+if __name__ == '__main__':
+    row = '\xff\x00\x00' * 4
+    png = encodePNG(4, 2, (row, row))
+    print dataURI(png)
@@ -1,6 +1,8 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-from svgplotlib.SVG.Parsers import Lexer, EOF
+import re
+
+from svgplotlib.SVG.Parsers import Lexer, EOF, SVGParseError
 
 class ParsePathError(Exception):
     pass
@@ -37,6 +39,16 @@ class Path(Lexer):
     
     numbers = frozenset((numfloat, numint, numexp))
     
+    # command letter and the argument text up to the next command
+    commands = re.compile(r'([AaCcHhLlMmQqSsTtVvZz])([^AaCcHhLlMmQqSsTtVvZz]*)')
+    
+    # split argument text into separators and numbers, including
+    # a bare exponent as accepted by the numexp token
+    splitNumbers = re.compile(r'(%s|[Ee][-\+]?\d+)' % Lexer.Float).split
+    
+    # same as the skip token
+    separators = ', \n'
+    
     def __init__(self):
         Lexer.__init__(self)
     
@@ -137,8 +149,77 @@ class Path(Lexer):
                 
             else:
                 raise ParsePathError("cmd '%s' in path data not supported" % cmd)
+    
+    def parse(self, text):
+        """
+        Parse a string of SVG <path> data to a list of (cmd, coords)
+        as given by iterparse.
+        
+        The commands are split out with one regex pass and the
+        numbers of each command are found and converted at once,
+        instead of lexing the data one token at a time.
+        
+        Unknown tokens raise SVGParseError and misplaced tokens
+        ParsePathError, as with iterparse. When the data holds more
+        than one error, the one reported may differ from iterparse.
+        """
+        assertion = self.assertion
+        splitNumbers = self.splitNumbers
+        separators = self.separators
+        
+        head = text.lstrip(separators)
+        if head and not head[0] in 'AaCcHhLlMmQqSsTtVvZz':
+            if splitNumbers(head, 1)[0]:
+                raise SVGParseError('Unknown token in path data')
+            raise ParsePathError('Expected string in path data')
+        
+        ret = []
+        append = ret.append
+        for cmd, args in self.commands.findall(text):
+            # every other item is a number, the rest must be separators
+            parts = splitNumbers(args)
+            if ''.join(parts[::2]).strip(separators):
+                raise SVGParseError('Unknown token in path data')
+            
+            numbers = parts[1::2]
+            try:
+                coords = map(float, numbers)
+            except ValueError:
+                coords = [float('1.' + value) if value[0] in 'Ee' else float(value)
+                          for value in numbers]
+            count = len(coords)
+            CMD = cmd.upper()
+            
+            # closePath
+            if CMD == 'Z':
+                assertion(count == 0, 'Expected string in path data')
+                append((cmd, (None,)))
+            
+            # moveTo, lineTo, curve, smoothQuadraticBezier, quadraticBezier, smoothCurve
+            elif CMD in 'CMLTQS':
+                assertion(count % 2 == 0, 'Expected number in path data')
+                if CMD == 'C':
+                    assertion(count % 3 == 0, 'Expected coordinate triplets in path data')
+                
+                append((cmd, tuple(coords)))
+            
+            # horizontalLine or verticalLine
+            elif CMD in 'HV':
+                assertion(count > 0, 'Expected number')
+                append((cmd, tuple(coords)))
+            
+            # ellipticalArc
+            else:
+                assertion(count > 0 and count % 7 == 0, 'expected number in path data')
+                # iterparse only checks rx of the first arc
+                assertion(coords[0] > 0 and min(coords[1::7]) > 0,
+                          'expected positive number in path data')
+                append((cmd, coords))
+        
+        return ret
 
 parsePath = Path()
 
 if __name__ == '__main__':
-    print tuple(parsePath.iterparse("M250,150 L150,350 L350,350 Z"))
\ No newline at end of file
+    print tuple(parsePath.iterparse("M250,150 L150,350 L350,350 Z"))
+    print parsePath.parse("M250,150 L150,350 L350,350 Z")
\ No newline at end of file
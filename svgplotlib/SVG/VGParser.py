@@ -2,12 +2,14 @@
 # -*- coding: utf-8 -*-
 import re
 import math
+from array import array
 
 import svgplotlib.VG as vg
-from svgplotlib.SVG.Parsers import parseLength, parseAngle, parseOpacity
+from svgplotlib.Cache import LRUCache
+from svgplotlib.SVG.Parsers import Lexer, parseLength, parseAngle, parseOpacity
 from svgplotlib.SVG.Parsers import parseDashArray, SVGParseError
 from svgplotlib.SVG.Colors import parseColor, SVGColorError
-from svgplotlib.SVG.Path import parsePath, ParsePathError
+from svgplotlib.SVG.Path import parsePath
 from svgplotlib.SVG.Style import parseStyle, ParseStyleError
 from svgplotlib.SVG.Transform import parseTransform, ParseTransformError
 
@@ -512,10 +514,11 @@ class Parser:
                 tr = vg.Matrix().Identity()
                 trans = tr.Map
                 
-            segments = []
-            data = []
+            # ready for vg.AppendPathData
+            segments = array('B')
+            data = array('f')
             
-            for op, args in parsePath.iterparse(pathdata):
+            for op, args in parsePath.parse(pathdata):
                 if op == "A" or op == "a":
                     rel = op == "a"
                     
@@ -576,32 +579,13 @@ class Parser:
             transform = node.get('gradientTransform')
             if transform is None:
                 return
-            
-        tr = vg.Matrix().Identity()
-        for op, args in parseTransform.iterparse(transform):
-            if op == 'scale':
-                tr *= vg.Matrix().Scale(*args)
-            elif op == 'translate':
-                tr *= vg.Matrix().Translate(*args)
-            elif op == "skewX":
-                tr *= vg.Matrix().Skew(args[0], 0.)
-            elif op == "skewY":
-                tr *= vg.Matrix().Skew(0., args[0])
-            elif op == 'rotate':
-                angle, center = args
-                if center is None:
-                    tr *= vg.Matrix().Rotate(angle)
-                else:
-                    cx, cy = center
-                    tmp = vg.Matrix().Translate(cx,cy)
-                    tmp *= vg.Matrix().Rotate(angle)
-                    tmp *= vg.Matrix().Translate(-cx,-cy)
-                    tr *= tmp
-                    
-            elif op == "matrix":
-                tr *= vg.Matrix(*args)
         
-        nodedata['transform'] = tr
+        # users of the matrix modify it in place, so hand out copies
+        tr = transformCache.get(transform)
+        if tr is None:
+            tr = transformCache[transform] = transformMatrix(transform)
+        
+        nodedata['transform'] = tr.Copy()
         
     def nodeStyle(self, node):
         nodedata = node.tail
@@ -740,6 +724,53 @@ pathCommands = {
     'T' : vg.SQUAD_TO_ABS,  't' : vg.SQUAD_TO_REL
 }
 
+# parsed transform matrices keyed on transform text
+transformCache = LRUCache(1024)
+
+# a single translate or scale with one or two numbers
+simpleTransform = re.compile(
+    r'\s*(translate|scale)\s*\(\s*(%s)(?:(?:\s*,\s*|\s+)(%s))?\s*\)\s*$' % (Lexer.Float, Lexer.Float)
+)
+
+def transformMatrix(transform):
+    '''
+    Return matrix for SVG transform text
+    '''
+    match = simpleTransform.match(transform)
+    if match is not None:
+        op, x, y = match.groups()
+        x = float(x)
+        if op == 'translate':
+            return vg.Matrix().Translate(x, 0. if y is None else float(y))
+        else:
+            return vg.Matrix().Scale(x, x if y is None else float(y))
+    
+    tr = vg.Matrix().Identity()
+    for op, args in parseTransform.iterparse(transform):
+        if op == 'scale':
+            tr *= vg.Matrix().Scale(*args)
+        elif op == 'translate':
+            tr *= vg.Matrix().Translate(*args)
+        elif op == "skewX":
+            tr *= vg.Matrix().Skew(args[0], 0.)
+        elif op == "skewY":
+            tr *= vg.Matrix().Skew(0., args[0])
+        elif op == 'rotate':
+            angle, center = args
+            if center is None:
+                tr *= vg.Matrix().Rotate(angle)
+            else:
+                cx, cy = center
+                tmp = vg.Matrix().Translate(cx,cy)
+                tmp *= vg.Matrix().Rotate(angle)
+                tmp *= vg.Matrix().Translate(-cx,-cy)
+                tr *= tmp
+                
+        elif op == "matrix":
+            tr *= vg.Matrix(*args)
+    
+    return tr
+
 def pathArgCount(cmd):
     one = (vg.HLINE_TO, vg.VLINE_TO)
     two = (vg.MOVE_TO, vg.LINE_TO, vg.SQUAD_TO)
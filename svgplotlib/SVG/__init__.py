@@ -3,13 +3,17 @@
 # This is code is commercial software.
 # Copyright © 2011 by Runar Tenfjord, Tenko.
 import sys
-from functools import partial
+from itertools import izip
 
 try:
     from xml.etree import cElementTree as etree
 except ImportError:
     from xml.etree import  ElementTree as etree
 
+# cElementTree creates comments and processing instructions with
+# the tag functions of ElementTree
+from xml.etree.ElementTree import Comment, ProcessingInstruction
+
 try:
     from cairosvg import CairoSVG
 except ImportError:
@@ -19,14 +23,50 @@ try:
     from cStringIO import StringIO
 except ImportError:
     from StringIO import StringIO
+
+from svgplotlib.Cache import LRUCache
+    
+# TEX parser and fonts are created on first use
+_tex = None
+
+# parsed TEX box trees keyed on (text, fontsize, dpi)
+_texboxes = LRUCache(256)
+
+def getTEX():
+    '''
+    Return the shared (parser, fonts) pair used for TEX strings.
     
-from svgplotlib.TEX.Parser import Parser
-from svgplotlib.TEX.Backends import SVGBackend
-from svgplotlib.TEX.Font import BakomaFonts
+    The pyparsing grammar and the Bakoma fonts are only loaded the
+    first time a TEX string is measured or rendered, so plots
+    without math labels do not pay for them.
+    '''
+    global _tex
+    if _tex is None:
+        from svgplotlib.TEX.Parser import Parser
+        from svgplotlib.TEX.Font import BakomaFonts
+        _tex = Parser(), BakomaFonts()
+    
+    return _tex
 
-# TEX parser and fonts
-tex_parser = Parser()
-tex_fonts = BakomaFonts()
+def parseTEX(text, fontsize = 24, dpi = 72):
+    '''
+    Return the box tree of TEX string.
+    
+    Box trees are cached and shared between documents. Rendering
+    does change them: ship sets the width of each list in a Vlist
+    to the width of that Vlist. The new width only depends on the
+    enclosing Vlist, which is set before its children, so every
+    render assigns the same widths and gives the same output. The
+    size of the root box, used for measuring, is never changed.
+    '''
+    key = text, fontsize, dpi
+    box = _texboxes.get(key)
+    if box is None:
+        tex_parser, tex_fonts = getTEX()
+        box = tex_parser.parse(text, tex_fonts, fontsize, dpi)
+        _texboxes[key] = box
+    
+    return box
 
 # Mangle names
 MangleDict = lambda d: dict((name.replace('_','-'),value) for name,value in d.items())
@@ -57,18 +97,122 @@ def CloneElement(elem):
         ret.append(CloneElement(child))
     return ret
 
+def escapeText(text):
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+def escapeAttrib(text):
+    text = escapeText(text)
+    if '"' in text:
+        text = text.replace('"', '&quot;')
+    if '\n' in text:
+        text = text.replace('\n', '&#10;')
+    return text
+
+def serializeElement(write, elem, raw = False):
+    '''
+    Write elem and children as XML text pieces. Attributes are
+    converted to valid text as in sanitize. If raw is set, text
+    of script and style elements is not escaped.
+    '''
+    tag = elem.tag
+    text = elem.text
+    
+    if tag is Comment:
+        write(u'<!--%s-->' % text)
+    elif tag is ProcessingInstruction:
+        write(u'<?%s?>' % text)
+    else:
+        write(u'<' + tag)
+        
+        for name, value in sorted(elem.items()):
+            if name == 'root':
+                continue
+            
+            if isinstance(value, (tuple,list)):
+                value = unicode(value)[1:-1]
+            elif not isinstance(value, basestring):
+                value = unicode(value)
+            
+            write(u' %s="%s"' % (name, escapeAttrib(value)))
+        
+        if text or len(elem):
+            write(u'>')
+            if text:
+                if not isinstance(text, basestring):
+                    text = unicode(text)
+                
+                if raw and (tag == 'script' or tag == 'style'):
+                    write(text)
+                else:
+                    write(escapeText(text))
+            
+            for child in elem:
+                serializeElement(write, child, raw)
+            
+            write(u'</' + tag + u'>')
+        else:
+            write(u' />')
+    
+    if elem.tail:
+        write(escapeText(elem.tail))
+
+def serialize(file, elem, encoding = 'utf-8', method = 'xml', chunksize = 4096):
+    '''
+    Write element tree as XML to file in a single pass over the
+    live tree, without building a sanitized copy first. Text is
+    encoded and written in chunks of chunksize pieces.
+    
+    method - 'xml' or 'svg'. With 'svg' the text of script and
+             style elements is written unescaped.
+    
+    >>> root = etree.Element('svg')
+    >>> root.append(etree.Comment(' a < b '))
+    >>> root.append(etree.ProcessingInstruction('target', 'data'))
+    >>> serialize(sys.stdout, root)
+    <svg><!-- a < b --><?target data?></svg>
+    '''
+    if encoding is None:
+        encoding = 'us-ascii'
+    
+    data = []
+    append = data.append
+    
+    def write(piece):
+        append(piece)
+        if len(data) >= chunksize:
+            file.write(u''.join(data).encode(encoding, 'xmlcharrefreplace'))
+            del data[:]
+    
+    serializeElement(write, elem, method == 'svg')
+    
+    if data:
+        file.write(u''.join(data).encode(encoding, 'xmlcharrefreplace'))
+
 class SVGBase(object):
     '''
     Wrapper class for etree.Element
     as in Python 2.6 and earlier etree.Element
     is a factor function and not a class.
+    
+    Element methods are looked up on the wrapped
+    element when used.
     '''
+    __slots__ = ('element',)
+    
     def __init__(self, name, **kwargs):
-        self.element = element = etree.Element(name, **kwargs)
-
-        for i in dir(element):
-            setattr(self, i, getattr(element,i) )
-
+        self.element = etree.Element(name, **kwargs)
+    
+    def __getattr__(self, name):
+        if name == 'element':
+            raise AttributeError(name)
+        return getattr(self.element, name)
+    
     def __iter__(self):
         return self.iter()
 
@@ -110,14 +254,99 @@ class SVGElement(SVGBase):
     '''
     Base class for SVG elements
     '''
+    __slots__ = ()
+    
     def __init__(self, name, **kwargs):
         # mangle names
         attrib = MangleDict(kwargs)
         
         parent = attrib.pop('parent')
+        attrib.pop('root', None)
         super(SVGElement,self).__init__(name, **attrib)
         parent.append(self.element)
 
+def elementFactory(name):
+    '''
+    Return method creating a child SVGElement
+    with the given tag name.
+    '''
+    def factory(self, **kwargs):
+        if not 'parent' in kwargs:
+            kwargs['parent'] = self
+        return SVGElement(name, **kwargs)
+    
+    factory.__name__ = name
+    return factory
+
+def containerFactory(name):
+    '''
+    Return method creating a child container element of the
+    class with given name. The class is looked up when called
+    so classes can be referenced before they are defined.
+    '''
+    def factory(self, *args, **kwargs):
+        if not 'parent' in kwargs:
+            kwargs['parent'] = self
+        if not 'root' in kwargs:
+            kwargs['root'] = self.root
+        return globals()[name](*args, **kwargs)
+    
+    factory.__name__ = name
+    return factory
+
+def createElements(parent, name, attrib):
+    '''
+    Append one child element per row of the sequence valued
+    attributes. Other values are shared by all children.
+    Returns the number of elements created.
+    '''
+    shared = {}
+    columns = {}
+    for key, value in attrib.iteritems():
+        if isinstance(value, basestring) or not hasattr(value, '__len__'):
+            shared[key] = value
+        else:
+            # numpy arrays are converted to python values
+            if hasattr(value, 'tolist'):
+                value = value.tolist()
+            columns[key] = value
+    
+    if not columns:
+        etree.SubElement(parent, name, shared)
+        return 1
+    
+    count = len(columns.itervalues().next())
+    for key, value in columns.iteritems():
+        if len(value) != count:
+            raise ValueError("Attribute '%s' has %d values, expected %d" % (key, len(value), count))
+    
+    names = columns.keys()
+    SubElement = etree.SubElement
+    for row in izip(*[columns[key] for key in names]):
+        attr = shared.copy()
+        attr.update(izip(names, row))
+        SubElement(parent, name, attr)
+    
+    return count
+
+def elementsFactory(name):
+    '''
+    Return method creating many child elements with the given
+    tag name from columns of attribute values, ex.
+    
+    >>> grp.Rects(x = xs, y = ys, width = 5, height = 5, fill = colors)
+    
+    Only the etree elements are created, no wrapper objects.
+    '''
+    def factory(self, **kwargs):
+        attrib = MangleDict(kwargs)
+        parent = attrib.pop('parent', self)
+        attrib.pop('root', None)
+        return createElements(parent.element, name, attrib)
+    
+    factory.__name__ = name.capitalize() + 's'
+    return factory
+
 class CSSElement(SVGBase):
     def __init__(self, **kwargs):
         """kwargs should be a dictionary of dictionaries.
@@ -174,36 +403,40 @@ class JSElement(SVGBase):
         self.element.text = u'<![CDATA[\n{0}\n]]>'.format(value)
 
 class Defs(SVGBase):
+    __slots__ = ('root',)
+    
     def __init__(self, **kwargs):
         # mangle names
         attrib = MangleDict(kwargs)
         
         parent = attrib.pop('parent')
+        self.root = attrib.pop('root')
         super(Defs,self).__init__('defs', **attrib)
         parent.append(self.element)
-        
-        root            = attrib.get('root')
-        self.Group      = partial(Group,                  parent=self, root = root)
-        self.Line       = partial(SVGElement, 'line',     parent=self, root = root)
-        self.Polyline   = partial(SVGElement, 'polyline', parent=self, root = root)
-        self.Polygon    = partial(SVGElement, 'polygon',  parent=self, root = root)
-        self.Rect       = partial(SVGElement, 'rect',     parent=self, root = root)
-        self.Circle     = partial(SVGElement, 'circle',   parent=self, root = root)
-        self.Ellipse    = partial(SVGElement, 'ellipse',  parent=self, root = root)
-        self.Path       = partial(SVGElement, 'path',     parent=self, root = root)
-        self.Text       = partial(SVGElement, 'text',     parent=self, root = root)
-        self.Tspan      = partial(SVGElement, 'tspan',    parent=self, root = root)
-        
-        self.linearGradient = partial(linearGradient, parent=self, root = root)
-        self.radialGradient = partial(radialGradient, parent=self, root = root)
+    
+    Group       = containerFactory('Group')
+    Line        = elementFactory('line')
+    Polyline    = elementFactory('polyline')
+    Polygon     = elementFactory('polygon')
+    Rect        = elementFactory('rect')
+    Circle      = elementFactory('circle')
+    Ellipse     = elementFactory('ellipse')
+    Path        = elementFactory('path')
+    Text        = elementFactory('text')
+    Tspan       = elementFactory('tspan')
+    
+    linearGradient = containerFactory('linearGradient')
+    radialGradient = containerFactory('radialGradient')
     
 class TEX(SVGBase):
+    __slots__ = ()
+    
+    Use  = elementFactory('use')
+    Rect = elementFactory('rect')
+    
     def __init__(self, text, **kwargs):
         root = kwargs.pop('root')
         
-        self.Use  = partial(SVGElement, 'use' , parent=self, root = root)
-        self.Rect = partial(SVGElement, 'rect', parent=self, root = root)
-        
         # mangle names
         attrib = MangleDict(kwargs)
         
@@ -223,8 +456,10 @@ class TEX(SVGBase):
         super(TEX, self).__init__('g',transform=' '.join(transform), **attrib)
         parent.append(self.element)
         
+        from svgplotlib.TEX.Backends import SVGBackend
+        
         renderer = SVGBackend(self, root)
-        box = tex_parser.parse(text, tex_fonts, 24, 72)
+        box = parseTEX(text, 24, 72)
         renderer.render(box)
         
 class EText(SVGBase):
@@ -232,6 +467,8 @@ class EText(SVGBase):
     Text with glyphs embedded in root object
     'defs' section.
     '''
+    __slots__ = ()
+    
     def __init__(self, font, text, **kwargs):
         root = kwargs.pop('root')
         
@@ -259,7 +496,6 @@ class EText(SVGBase):
         for x, glyph_id in zip(xpositions, glyph_ids):
             obj = SVGElement('use', x = "%g" % x, parent = self)
             obj.set('xlink:href', '#%s' % glyph_id)
-            self.append(obj.element)
         
         # add to new glyps defs section
         defs = root.defs
@@ -267,6 +503,8 @@ class EText(SVGBase):
             defs.Path(id = name, d = path)
 
 class Gradient(SVGBase):
+    __slots__ = ()
+    
     def __init__(self, **kwargs):
         """
         Creates a gradient definition. Give each gradient
@@ -287,20 +525,21 @@ class Gradient(SVGBase):
         attrib = MangleDict(kwargs)
         
         parent = attrib.pop('parent')
+        attrib.pop('root', None)
         super(Gradient,self).__init__( self.__class__.__name__, **attrib )
         parent.append(self.element)
-        
-        root = attrib.get('root')
-        self.Stop = partial(SVGElement, 'stop', parent=self, root = root)
-        
+    
+    Stop = elementFactory('stop')
 
 class linearGradient(Gradient):
-    pass
+    __slots__ = ()
 
 class radialGradient(Gradient):
-    pass
+    __slots__ = ()
         
 class Group(SVGBase):
+    __slots__ = ('root',)
+    
     def __init__(self, **kwargs):
         '''
         >>> import math
@@ -316,23 +555,30 @@ class Group(SVGBase):
         attrib = MangleDict(kwargs)
         
         parent = attrib.pop('parent')
+        self.root = attrib.pop('root')
         super(Group, self).__init__('g', **attrib)
         parent.append(self.element)
-        
-        root = attrib.get('root')
-        self.Group    = partial(Group,                  parent=self, root = root)
-        self.Use      = partial(SVGElement, 'use',      parent=self, root = root)
-        self.Line     = partial(SVGElement, 'line',     parent=self, root = root)
-        self.Polyline = partial(SVGElement, 'polyline', parent=self, root = root)
-        self.Polygon  = partial(SVGElement, 'polygon',  parent=self, root = root)
-        self.Rect     = partial(SVGElement, 'rect',     parent=self, root = root)
-        self.Circle   = partial(SVGElement, 'circle',   parent=self, root = root)
-        self.Ellipse  = partial(SVGElement, 'ellipse',  parent=self, root = root)
-        self.Path     = partial(SVGElement, 'path',     parent=self, root = root)
-        self.Text     = partial(SVGElement, 'text',     parent=self, root = root)
-        self.Tspan    = partial(SVGElement, 'tspan',    parent=self, root = root)
-        self.EText    = partial(EText,                  parent=self, root = root)
-        self.TEX      = partial(TEX,                    parent=self, root = root)
+    
+    Group       = containerFactory('Group')
+    Use         = elementFactory('use')
+    Line        = elementFactory('line')
+    Polyline    = elementFactory('polyline')
+    Polygon     = elementFactory('polygon')
+    Rect        = elementFactory('rect')
+    Circle      = elementFactory('circle')
+    Ellipse     = elementFactory('ellipse')
+    Path        = elementFactory('path')
+    Text        = elementFactory('text')
+    Tspan       = elementFactory('tspan')
+    Image       = elementFactory('image')
+    EText       = containerFactory('EText')
+    TEX         = containerFactory('TEX')
+    
+    Uses        = elementsFactory('use')
+    Lines       = elementsFactory('line')
+    Rects       = elementsFactory('rect')
+    Circles     = elementsFactory('circle')
+    Ellipses    = elementsFactory('ellipse')
 
 class SVG(SVGBase):
     '''
@@ -393,26 +639,37 @@ class SVG(SVGBase):
         
         super(SVG, self).__init__('svg', **attr)
         
-        self.Defs       = partial(Defs,                     parent=self, root = self)
-        self.Style      = partial(CSSElement,               parent=self, root = self)
-        self.Script     = partial(JSElement ,               parent=self, root = self)
-        self.Group      = partial(Group,                    parent=self, root = self)
-        self.Circle     = partial(SVGElement, 'circle',     parent=self, root = self)
-        self.Ellipse    = partial(SVGElement, 'ellipse',    parent=self, root = self)
-        self.Line       = partial(SVGElement, 'line',       parent=self, root = self)
-        self.Path       = partial(SVGElement, 'path',       parent=self, root = self)
-        self.Polygon    = partial(SVGElement, 'polygon',    parent=self, root = self)
-        self.Polyline   = partial(SVGElement, 'polyline',   parent=self, root = self)
-        self.Rect       = partial(SVGElement, 'rect',       parent=self, root = self)
-        self.Text       = partial(SVGElement, 'text',       parent=self, root = self)
-        self.Use        = partial(SVGElement, 'use',        parent=self, root = self)
-        self.EText      = partial(EText,                    parent=self, root = self)
-        self.TEX        = partial(TEX,                      parent=self, root = self)
-        
         # embedded font
         self.glyphs = set()
         self.defs = self.Defs()
         
+    Defs        = containerFactory('Defs')
+    Style       = containerFactory('CSSElement')
+    Script      = containerFactory('JSElement')
+    Group       = containerFactory('Group')
+    Circle      = elementFactory('circle')
+    Ellipse     = elementFactory('ellipse')
+    Line        = elementFactory('line')
+    Path        = elementFactory('path')
+    Polygon     = elementFactory('polygon')
+    Polyline    = elementFactory('polyline')
+    Rect        = elementFactory('rect')
+    Text        = elementFactory('text')
+    Use         = elementFactory('use')
+    Image       = elementFactory('image')
+    EText       = containerFactory('EText')
+    TEX         = containerFactory('TEX')
+    
+    Uses        = elementsFactory('use')
+    Lines       = elementsFactory('line')
+    Rects       = elementsFactory('rect')
+    Circles     = elementsFactory('circle')
+    Ellipses    = elementsFactory('ellipse')
+    
+    @property
+    def root(self):
+        return self
+    
     def write(self, file = sys.stdout, header = True, encoding='utf-8', **kwargs):
         '''
         Writes the element tree to a file, as XML. Attributes
@@ -421,15 +678,28 @@ class SVG(SVGBase):
         file - A file name, or a file object opened for writing.
         header - Write svg decleration header to file
         encoding - Output encoding, default is 'utf-8'
+        
+        The tree is streamed to the file. Keyword arguments other than
+        method = 'xml' or 'svg' are passed on to ElementTree.write,
+        which serializes a sanitized copy of the tree.
         '''
+        if isinstance(file, basestring):
+            with open(file, 'wb') as fh:
+                return self.write(fh, header, encoding, **kwargs)
+        
         if header:
             if encoding is None:
                 file.write(SVG.HEADER)
             else:
                 file.write(SVG.HEADER.encode(encoding))
-            
-        tree = etree.ElementTree(CloneElement(self))
-        tree.write(file, encoding = encoding, **kwargs)
+        
+        method = kwargs.pop('method', 'xml')
+        if kwargs or not method in ('xml', 'svg'):
+            tree = etree.ElementTree(CloneElement(self))
+            tree.write(file, encoding = encoding, method = method, **kwargs)
+            return
+        
+        serialize(file, self.element, encoding, method)
     
     def writePNG(self, filename, width = -1, height = -1, scale = 1.):
         '''
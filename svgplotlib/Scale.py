@@ -6,8 +6,21 @@
 # License: LGPL
 import math
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from svgplotlib.Cache import LRUCache
+
 EPS = 1.e-6
 
+# tick counts from which numpy is used to build ticks
+NUMPY_TICKS = 64
+
+# (majorTicks, minorTicks) keyed on (x1, x2, maxNumSteps, maxMinSteps)
+_ticks = LRUCache(1024)
+
 def fuzzyCompare(value1, value2, intervalSize):
     '''
     Compare 2 values, relative to an interval
@@ -71,6 +84,24 @@ def ceil125(x):
     
     return sign * fr * math.pow(10., p10)
 
+def ceil125Array(x):
+    '''
+    ceil125 for an array of values
+    '''
+    x = numpy.asarray(x, dtype = float)
+    ax = numpy.abs(x)
+    nonzero = ax != 0.
+    
+    lx = numpy.log10(numpy.where(nonzero, ax, 1.))
+    p10 = numpy.floor(lx)
+    fr = numpy.power(10., lx - p10)
+    
+    fr = numpy.where(fr <= 1., 1.,
+         numpy.where(fr <= 2., 2.,
+         numpy.where(fr <= 5., 5., 10.)))
+    
+    return numpy.where(nonzero, numpy.sign(x)*fr*numpy.power(10., p10), 0.)
+
 def floor125(x):
     '''
     Find the largest value out of {1,2,5}*10^n with an 
@@ -143,6 +174,57 @@ class Scale:
         
         return stepSize
     
+    def autoTicks(self, x1, x2, maxNumSteps = 5, maxMinSteps = 2):
+        '''
+        Find step size and build (majorTicks, minorTicks) for an
+        interval. Results are cached and returned as tuples.
+        '''
+        key = x1, x2, maxNumSteps, maxMinSteps
+        ticks = _ticks.get(key)
+        if ticks is None:
+            stepSize = self.autoScale(x1, x2, maxNumSteps)
+            ticks = self.cacheTicks(key, stepSize)
+        
+        return ticks
+    
+    def autoTicksMany(self, ranges, maxNumSteps = 5, maxMinSteps = 2):
+        '''
+        autoTicks for a sequence of (x1, x2) intervals. With numpy
+        the step sizes of all intervals are found in one operation.
+        '''
+        ranges = list(ranges)
+        keys = [(x1, x2, maxNumSteps, maxMinSteps) for x1, x2 in ranges]
+        
+        ret = [_ticks.get(key) for key in keys]
+        missing = [i for i, ticks in enumerate(ret) if ticks is None]
+        if not missing:
+            return ret
+        
+        if numpy is None:
+            for i in missing:
+                x1, x2 = ranges[i]
+                ret[i] = self.autoTicks(x1, x2, maxNumSteps, maxMinSteps)
+            return ret
+        
+        width = numpy.array([abs(ranges[i][1] - ranges[i][0]) for i in missing], dtype = float)
+        numSteps = max(maxNumSteps,1)
+        stepSizes = ceil125Array((width - (EPS * width)) / numSteps)
+        
+        for i, stepSize in zip(missing, stepSizes.tolist()):
+            ret[i] = self.cacheTicks(keys[i], stepSize)
+        
+        return ret
+    
+    def cacheTicks(self, key, stepSize):
+        x1, x2, maxNumSteps, maxMinSteps = key
+        majorTicks, minorTicks = self.buildTicks(x1, x2, stepSize, maxMinSteps)
+        
+        if not minorTicks is None:
+            minorTicks = tuple(minorTicks)
+        
+        ticks = _ticks[key] = tuple(majorTicks), minorTicks
+        return ticks
+    
     def divideScale(x1, x2, maxMajSteps, imaxMinSteps, stepSize):
         """
         Calculate ticks for an interval
@@ -183,9 +265,13 @@ class Scale:
             numTicks = 10000
         
         x = min(x1,x2)
-        ticks = [x]
-        for i in range(1, numTicks):
-            ticks.append(x + i*stepSize)
+        if numpy is not None and numTicks >= NUMPY_TICKS:
+            ticks = [x]
+            ticks.extend((x + numpy.arange(1, numTicks)*stepSize).tolist())
+        else:
+            ticks = [x]
+            for i in range(1, numTicks):
+                ticks.append(x + i*stepSize)
         
         ticks.append(max(x1,x2))
         
@@ -207,6 +293,17 @@ class Scale:
             numTicks = 1
             minStep = stepSize * .5
         
+        if numpy is not None and len(majorTicks)*numTicks >= NUMPY_TICKS:
+            # running sum from each major tick gives the same
+            # values as the loop below
+            steps = numpy.empty((len(majorTicks) - 1, numTicks + 1))
+            steps[:,0] = majorTicks[:-1]
+            steps[:,1:] = minStep
+            values = numpy.add.accumulate(steps, axis = 1)[:,1:].ravel()
+            
+            eps = abs(EPS * stepSize)
+            return numpy.where(numpy.abs(values) <= eps, 0., values).tolist()
+        
         # calculate minor ticks
         minorTicks = []
         for i in range(len(majorTicks) - 1):
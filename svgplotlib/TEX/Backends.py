@@ -1,19 +1,12 @@
 #!python -u
 # -*- coding: utf-8 -*-
 # Copyright 2007 by Runar Tenfjord, Tenko.
-import re
 import math
 
+from svgplotlib.TEX import isTEX
 from svgplotlib.TEX.Parser import ship
 from svgplotlib.TEX.Font import unichr_safe, ft
 
-def isTEX(s):
-    """Check if string is a TEX string"""
-    if re.match(r'.*\$.+\$.*', s, re.MULTILINE | re.DOTALL):
-        return True
-        
-    return False
-    
 class ImageBackend:
     '''
     Image backend renders to a 8 bit grey scale image
@@ -143,8 +136,10 @@ class SVGBackend:
             self.root = svg
         else:
             self.root = root
-            
-        self.seen = set()
+        
+        # glyph definitions are shared by all TEX
+        # elements in the document
+        self.seen = self.root.glyphs
     
     def set_canvas_size(self, width, height, depth):
         'Dimension the drawing canvas'
@@ -169,7 +164,7 @@ class SVGBackend:
             self.seen.add(defid)
         
             path = info.font.SVGGlyph(ord(thetext), info.fontsize)
-            self.root.Path(id = defid, d = path)
+            self.root.defs.Path(id = defid, d = path)
         
     def render_rect_filled(self, x1, y1, x2, y2):
         """
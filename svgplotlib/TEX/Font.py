@@ -7,8 +7,13 @@ from os.path import join, abspath, dirname
 from collections import namedtuple
 
 from svgplotlib.Config import *
+from svgplotlib.Cache import LRUCache
 import svgplotlib.freetype as ft
 
+# glyph outlines shared by all fonts objects and documents,
+# keyed on (font file, char code, fontsize)
+_glyphpaths = LRUCache(4096)
+
 def unichr_safe(index):
     """
     Return the Unicode character corresponding to the index,
@@ -64,6 +69,17 @@ class Font(ft.FT2Font):
         '''
         Return SVG paths of glyp
         '''
+        key = self.fname, ccode, fontsize
+        path = _glyphpaths.get(key)
+        if path is None:
+            path = _glyphpaths[key] = self.buildSVGGlyph(ccode, fontsize)
+        
+        return path
+    
+    def buildSVGGlyph(self, ccode, fontsize):
+        '''
+        Build SVG paths of glyp from outline
+        '''
         self.set_size(fontsize, 72)
         glyph = self.load_char(ccode)
         
@@ -118,7 +134,7 @@ class BakomaFonts:
     """
     def __init__(self):
         self.fontMap = {}
-        self.glyphd = {}
+        self.glyphd = LRUCache(8192)
         self.used_characters = {}
         
         # load fonts into dict
@@ -168,8 +184,9 @@ class BakomaFonts:
         
     def get_info(self, fontname, fontclass, sym, fontsize, dpi):
         key = (fontname, fontclass, sym, fontsize, dpi)
-        if key in self.glyphd:
-            return self.glyphd[key]
+        result = self.glyphd.get(key)
+        if result is not None:
+            return result
         
         font, num, symbolname, slanted = self.get_glyph(fontname, sym)
         
@@ -44,10 +44,12 @@ DELTA           = 0.18
 class MathTextWarning(Warning):
     pass
 
-class Node:
+class Node(object):
     """
     A node in the TeX box model
     """
+    __slots__ = ('size',)
+
     def __init__(self):
         self.size = 0
 
@@ -78,6 +80,8 @@ class Box(Node):
     """
     Represents any node with a physical location.
     """
+    __slots__ = ('width', 'height', 'depth')
+
     def __init__(self, width, height, depth):
         Node.__init__(self)
         self.width  = width
@@ -104,6 +108,8 @@ class Vbox(Box):
     """
     A box with only height (zero width).
     """
+    __slots__ = ()
+
     def __init__(self, height, depth):
         Box.__init__(self, 0., height, depth)
 
@@ -111,6 +117,8 @@ class Hbox(Box):
     """
     A box with only width (zero height and depth).
     """
+    __slots__ = ()
+
     def __init__(self, width):
         Box.__init__(self, width, 0., 0.)
 
@@ -125,6 +133,9 @@ class Char(Node):
     from width) must be converted into a :class:`Kern` node when the
     :class:`Char` is added to its parent :class:`Hlist`.
     """
+    __slots__ = ('c', 'font_output', 'font', 'font_class', 'fontsize', 'dpi',
+                 '_metrics', 'width', 'height', 'depth')
+
     def __init__(self, c, state):
         Node.__init__(self)
         self.c = c
@@ -202,6 +213,8 @@ class Accent(Char):
     since they are already offset correctly from the baseline in
     TrueType fonts.
     """
+    __slots__ = ()
+
     def _update_metrics(self):
         metrics = self._metrics = self.font_output.get_metrics(
             self.font, self.font_class, self.c, self.fontsize, self.dpi)
@@ -229,6 +242,9 @@ class List(Box):
     """
     A list of nodes (either horizontal or vertical).
     """
+    __slots__ = ('shift_amount', 'children', 'glue_set', 'glue_sign',
+                 'glue_order', 'glue_ratio')
+
     def __init__(self, elements):
         Box.__init__(self, 0., 0., 0.)
         self.shift_amount = 0.   # An arbitrary offset
@@ -290,6 +306,8 @@ class Hlist(List):
     """
     A horizontal list of boxes.
     """
+    __slots__ = ('function_name',)
+
     def __init__(self, elements, w=0., m='additional', do_kern=True):
         List.__init__(self, elements)
         if do_kern:
@@ -388,6 +406,8 @@ class Vlist(List):
     """
     A vertical list of boxes.
     """
+    __slots__ = ()
+
     def __init__(self, elements, h=0., m='additional'):
         List.__init__(self, elements)
         self.vpack()
@@ -468,6 +488,8 @@ class Rule(Box):
     dimension." The width is never running in an :class:`Hlist`; the
     height and depth are never running in a :class:`Vlist`.
     """
+    __slots__ = ('font_output',)
+
     def __init__(self, width, height, depth, state):
         Box.__init__(self, width, height, depth)
         self.font_output = state.font_output
@@ -479,6 +501,8 @@ class Hrule(Rule):
     """
     Convenience class to create a horizontal rule.
     """
+    __slots__ = ()
+
     def __init__(self, state, thickness=None):
         if thickness is None:
             thickness = state.font_output.get_underline_thickness(state.fontsize, state.dpi)
@@ -489,6 +513,8 @@ class Vrule(Rule):
     """
     Convenience class to create a vertical rule.
     """
+    __slots__ = ()
+
     def __init__(self, state):
         thickness = state.font_output.get_underline_thickness(
             state.font, state.fontsize, state.dpi)
@@ -501,6 +527,8 @@ class Glue(Node):
     is a memory optimization which probably doesn't matter anymore, but it's
     easier to stick to what TeX does.)
     """
+    __slots__ = ('glue_subtype', 'glue_spec')
+
     def __init__(self, glue_type, copy=False):
         Node.__init__(self)
         self.glue_subtype   = 'normal'
@@ -531,6 +559,8 @@ class GlueSpec(object):
     """
     See :class:`Glue`.
     """
+    __slots__ = ('width', 'stretch', 'stretch_order', 'shrink', 'shrink_order')
+
     def __init__(self, width=0., stretch=0., stretch_order=0, shrink=0., shrink_order=0):
         self.width         = width
         self.stretch       = stretch
@@ -564,30 +594,44 @@ GlueSpec._types = {
 # Some convenient ways to get common kinds of glue
 
 class Fil(Glue):
+    __slots__ = ()
+
     def __init__(self):
         Glue.__init__(self, 'fil')
 
 class Fill(Glue):
+    __slots__ = ()
+
     def __init__(self):
         Glue.__init__(self, 'fill')
 
 class Filll(Glue):
+    __slots__ = ()
+
     def __init__(self):
         Glue.__init__(self, 'filll')
 
 class NegFil(Glue):
+    __slots__ = ()
+
     def __init__(self):
         Glue.__init__(self, 'neg_fil')
 
 class NegFill(Glue):
+    __slots__ = ()
+
     def __init__(self):
         Glue.__init__(self, 'neg_fill')
 
 class NegFilll(Glue):
+    __slots__ = ()
+
     def __init__(self):
         Glue.__init__(self, 'neg_filll')
 
 class SsGlue(Glue):
+    __slots__ = ()
+
     def __init__(self):
         Glue.__init__(self, 'ss')
 
@@ -596,15 +640,19 @@ class HCentered(Hlist):
     A convenience class to create an :class:`Hlist` whose contents are
     centered within its enclosing box.
     """
+    __slots__ = ()
+
     def __init__(self, elements):
         Hlist.__init__(self, [SsGlue()] + elements + [SsGlue()],
                        do_kern=False)
 
-class VCentered(Hlist):
+class VCentered(Vlist):
     """
     A convenience class to create a :class:`Vlist` whose contents are
     centered within its enclosing box.
     """
+    __slots__ = ()
+
     def __init__(self, elements):
         Vlist.__init__(self, [SsGlue()] + elements + [SsGlue()])
 
@@ -618,6 +666,8 @@ class Kern(Node):
     when its *width* denotes additional spacing in the vertical
     direction.
     """
+    __slots__ = ('width',)
+
     def __init__(self, width):
         Node.__init__(self)
         self.width = width
@@ -642,6 +692,8 @@ class SubSuperCluster(Hlist):
     and super-script, such that if another script follows that needs
     to be attached, it can be reconfigured on the fly.
     """
+    __slots__ = ('nucleus', 'sub', 'super')
+
     def __init__(self):
         self.nucleus = None
         self.sub = None
@@ -656,6 +708,8 @@ class AutoHeightChar(Hlist):
     fonts), the correct glyph will be selected, otherwise this will
     always just return a scaled version of the glyph.
     """
+    __slots__ = ()
+
     def __init__(self, c, height, depth, state, always=False):
         alternatives = state.font_output.get_sized_alternatives_for_symbol(
             state.font, c)
@@ -684,6 +738,8 @@ class AutoWidthChar(Hlist):
     correct glyph will be selected, otherwise this will always just
     return a scaled version of the glyph.
     """
+    __slots__ = ()
+
     def __init__(self, c, width, state, always=False, char_class=Char):
         alternatives = state.font_output.get_sized_alternatives_for_symbol(
             state.font, c)
@@ -702,16 +758,41 @@ class AutoWidthChar(Hlist):
         Hlist.__init__(self, [char])
         self.width = char.width
 
+# node kinds used by Ship
+CHAR, KERN, HLIST, VLIST, RULE, GLUE, OTHER = range(7)
+
+def nodeKind(cls):
+    """
+    Return the kind of node class *cls* as handled by :class:`Ship`.
+    """
+    if issubclass(cls, Char):
+        return CHAR
+    elif issubclass(cls, Kern):
+        return KERN
+    elif issubclass(cls, Hlist):
+        return HLIST
+    elif issubclass(cls, List):
+        return VLIST
+    elif issubclass(cls, Box):
+        return RULE
+    elif issubclass(cls, Glue):
+        return GLUE
+    return OTHER
+
 class Ship:
     """
     Once the boxes have been set up, this sends them to output.  Since
     boxes can be inside of boxes inside of boxes, the main work of
-    :class:`Ship` is done by two mutually recursive routines,
-    :meth:`hlist_out` and :meth:`vlist_out`, which traverse the
+    :class:`Ship` is done in :meth:`list_out`, which traverses the
     :class:`Hlist` nodes and :class:`Vlist` nodes inside of horizontal
-    and vertical boxes.  The global variables used in TeX to store
-    state as it processes have become member variables here.
+    and vertical boxes with an explicit stack instead of recursion.
+    The global variables used in TeX to store state as it processes
+    have become member variables here.
     """
+    def __init__(self):
+        # node class -> kind, filled on first use
+        self.kinds = {}
+
     def __call__(self, renderer, ox, oy, box):
         self.max_push    = 0 # Deepest nesting of push commands so far
         self.cur_s       = 0
@@ -719,7 +800,7 @@ class Ship:
         self.cur_h       = 0.
         self.off_h       = ox
         self.off_v       = oy + box.height
-        self.hlist_out(renderer, box)
+        self.list_out(renderer, box)
 
     def clamp(value):
         if value < -1000000000.:
@@ -729,127 +810,169 @@ class Ship:
         return value
     clamp = staticmethod(clamp)
 
-    def hlist_out(self, renderer, box):
-        cur_g         = 0
-        cur_glue      = 0.
-        glue_order    = box.glue_order
-        glue_sign     = box.glue_sign
-        base_line     = self.cur_v
-        left_edge     = self.cur_h
-        self.cur_s    += 1
-        self.max_push = max(self.cur_s, self.max_push)
+    def list_out(self, renderer, box):
+        """
+        Output *box* as a horizontal list together with all lists
+        inside it.  The state of the enclosing lists is kept on a
+        stack while a nested list is output (node619 and node629).
+        """
+        kinds         = self.kinds
         clamp         = self.clamp
-
-        for p in box.children:
-            if isinstance(p, Char):
-                p.render(renderer, self.cur_h + self.off_h, self.cur_v + self.off_v)
-                self.cur_h += p.width
-            elif isinstance(p, Kern):
-                self.cur_h += p.width
-            elif isinstance(p, List):
-                # node623
-                if len(p.children) == 0:
-                    self.cur_h += p.width
-                else:
-                    edge = self.cur_h
-                    self.cur_v = base_line + p.shift_amount
-                    if isinstance(p, Hlist):
-                        self.hlist_out(renderer, p)
-                    else:
-                        # p.vpack(box.height + box.depth, 'exactly')
-                        self.vlist_out(renderer, p)
-                    self.cur_h = edge + p.width
-                    self.cur_v = base_line
-            elif isinstance(p, Box):
-                # node624
-                rule_height = p.height
-                rule_depth  = p.depth
-                rule_width  = p.width
-                if math.isinf(rule_height):
-                    rule_height = box.height
-                if math.isinf(rule_depth):
-                    rule_depth = box.depth
-                if rule_height > 0 and rule_width > 0:
-                    self.cur_v = baseline + rule_depth
-                    p.render(renderer,
-                             self.cur_h + self.off_h,
-                             self.cur_v + self.off_v,
-                             rule_width, rule_height)
-                    self.cur_v = baseline
-                self.cur_h += rule_width
-            elif isinstance(p, Glue):
-                # node625
-                glue_spec = p.glue_spec
-                rule_width = glue_spec.width - cur_g
-                if glue_sign != 0: # normal
-                    if glue_sign == 1: # stretching
-                        if glue_spec.stretch_order == glue_order:
-                            cur_glue += glue_spec.stretch
-                            cur_g = round(clamp(float(box.glue_set) * cur_glue))
-                    elif glue_spec.shrink_order == glue_order:
-                        cur_glue += glue_spec.shrink
-                        cur_g = round(clamp(float(box.glue_set) * cur_glue))
-                rule_width += cur_g
-                self.cur_h += rule_width
-        self.cur_s -= 1
-
-    def vlist_out(self, renderer, box):
+        off_h         = self.off_h
+        off_v         = self.off_v
+        cur_h         = self.cur_h
+        cur_v         = self.cur_v
+        cur_s         = self.cur_s + 1
+        max_push      = max(cur_s, self.max_push)
+        stack         = []
+        push          = stack.append
+
+        # state of the current list
+        hmode         = True
+        children      = box.children
+        index         = 0
         cur_g         = 0
         cur_glue      = 0.
         glue_order    = box.glue_order
         glue_sign     = box.glue_sign
-        self.cur_s    += 1
-        self.max_push = max(self.max_push, self.cur_s)
-        left_edge     = self.cur_h
-        self.cur_v    -= box.height
-        top_edge      = self.cur_v
-        clamp         = self.clamp
-
-        for p in box.children:
-            if isinstance(p, Kern):
-                self.cur_v += p.width
-            elif isinstance(p, List):
-                if len(p.children) == 0:
-                    self.cur_v += p.height + p.depth
+        edge          = cur_v  # base line in hlist, left edge in vlist
+        saved         = 0.
+
+        while True:
+            if index == len(children):
+                # end of list, continue with enclosing list
+                cur_s -= 1
+                if not stack:
+                    break
+
+                p = box
+                (box, children, index, cur_g, cur_glue, glue_order,
+                 glue_sign, hmode, edge, saved) = stack.pop()
+
+                if hmode:
+                    cur_h = saved + p.width
+                    cur_v = edge
                 else:
-                    self.cur_v += p.height
-                    self.cur_h = left_edge + p.shift_amount
-                    save_v = self.cur_v
+                    cur_v = saved + p.depth
+                    cur_h = edge
+                continue
+
+            p = children[index]
+            index += 1
+
+            cls = p.__class__
+            kind = kinds.get(cls)
+            if kind is None:
+                kind = kinds[cls] = nodeKind(cls)
+
+            if hmode:
+                if kind == CHAR:
+                    p.render(renderer, cur_h + off_h, cur_v + off_v)
+                    cur_h += p.width
+                elif kind == KERN:
+                    cur_h += p.width
+                elif kind == HLIST or kind == VLIST:
+                    # node623
+                    if len(p.children) == 0:
+                        cur_h += p.width
+                        continue
+                    saved = cur_h
+                    cur_v = edge + p.shift_amount
+                elif kind == RULE:
+                    # node624
+                    rule_height = p.height
+                    rule_depth  = p.depth
+                    rule_width  = p.width
+                    if math.isinf(rule_height):
+                        rule_height = box.height
+                    if math.isinf(rule_depth):
+                        rule_depth = box.depth
+                    if rule_height > 0 and rule_width > 0:
+                        cur_v = edge + rule_depth
+                        p.render(renderer,
+                                 cur_h + off_h,
+                                 cur_v + off_v,
+                                 rule_width, rule_height)
+                        cur_v = edge
+                    cur_h += rule_width
+                elif kind == GLUE:
+                    # node625
+                    glue_spec = p.glue_spec
+                    rule_width = glue_spec.width - cur_g
+                    if glue_sign != 0: # normal
+                        if glue_sign == 1: # stretching
+                            if glue_spec.stretch_order == glue_order:
+                                cur_glue += glue_spec.stretch
+                                cur_g = round(clamp(float(box.glue_set) * cur_glue))
+                        elif glue_spec.shrink_order == glue_order:
+                            cur_glue += glue_spec.shrink
+                            cur_g = round(clamp(float(box.glue_set) * cur_glue))
+                    rule_width += cur_g
+                    cur_h += rule_width
+            else:
+                if kind == KERN:
+                    cur_v += p.width
+                elif kind == HLIST or kind == VLIST:
+                    if len(p.children) == 0:
+                        cur_v += p.height + p.depth
+                        continue
+                    cur_v += p.height
+                    cur_h = edge + p.shift_amount
+                    saved = cur_v
                     p.width = box.width
-                    if isinstance(p, Hlist):
-                        self.hlist_out(renderer, p)
-                    else:
-                        self.vlist_out(renderer, p)
-                    self.cur_v = save_v + p.depth
-                    self.cur_h = left_edge
-            elif isinstance(p, Box):
-                rule_height = p.height
-                rule_depth = p.depth
-                rule_width = p.width
-                if math.isinf(rule_width):
-                    rule_width = box.width
-                rule_height += rule_depth
-                if rule_height > 0 and rule_depth > 0:
-                    self.cur_v += rule_height
-                    p.render(renderer,
-                             self.cur_h + self.off_h,
-                             self.cur_v + self.off_v,
-                             rule_width, rule_height)
-            elif isinstance(p, Glue):
-                glue_spec = p.glue_spec
-                rule_height = glue_spec.width - cur_g
-                if glue_sign != 0: # normal
-                    if glue_sign == 1: # stretching
-                        if glue_spec.stretch_order == glue_order:
-                            cur_glue += glue_spec.stretch
+                elif kind == RULE:
+                    rule_height = p.height
+                    rule_depth = p.depth
+                    rule_width = p.width
+                    if math.isinf(rule_width):
+                        rule_width = box.width
+                    rule_height += rule_depth
+                    if rule_height > 0 and rule_depth > 0:
+                        cur_v += rule_height
+                        p.render(renderer,
+                                 cur_h + off_h,
+                                 cur_v + off_v,
+                                 rule_width, rule_height)
+                elif kind == GLUE:
+                    glue_spec = p.glue_spec
+                    rule_height = glue_spec.width - cur_g
+                    if glue_sign != 0: # normal
+                        if glue_sign == 1: # stretching
+                            if glue_spec.stretch_order == glue_order:
+                                cur_glue += glue_spec.stretch
+                                cur_g = round(clamp(float(box.glue_set) * cur_glue))
+                        elif glue_spec.shrink_order == glue_order: # shrinking
+                            cur_glue += glue_spec.shrink
                             cur_g = round(clamp(float(box.glue_set) * cur_glue))
-                    elif glue_spec.shrink_order == glue_order: # shrinking
-                        cur_glue += glue_spec.shrink
-                        cur_g = round(clamp(float(box.glue_set) * cur_glue))
-                rule_height += cur_g
-                self.cur_v += rule_height
-            elif isinstance(p, Char):
-                raise RuntimeError("Internal mathtext error: Char node found in vlist")
-        self.cur_s -= 1
+                    rule_height += cur_g
+                    cur_v += rule_height
+                elif kind == CHAR:
+                    raise RuntimeError("Internal mathtext error: Char node found in vlist")
+
+            if kind == HLIST or kind == VLIST:
+                # save current list and continue with nested list
+                push((box, children, index, cur_g, cur_glue, glue_order,
+                      glue_sign, hmode, edge, saved))
+
+                box           = p
+                children      = p.children
+                index         = 0
+                cur_g         = 0
+                cur_glue      = 0.
+                glue_order    = p.glue_order
+                glue_sign     = p.glue_sign
+                hmode         = kind == HLIST
+                if hmode:
+                    edge      = cur_v
+                else:
+                    edge      = cur_h
+                    cur_v    -= p.height
+                cur_s        += 1
+                max_push      = max(cur_s, max_push)
+
+        self.cur_h    = cur_h
+        self.cur_v    = cur_v
+        self.cur_s    = cur_s
+        self.max_push = max_push
 
 ship = Ship()
\ No newline at end of file
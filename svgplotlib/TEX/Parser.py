@@ -313,6 +313,15 @@ class Parser:
         Returns the parse tree of :class:`Node` instances.
         """
         self._state_stack = [self.State(fonts_object, 'cmr10', 'rm', fontsize, dpi)]
+        
+        # plain text without math gives the same tree as the
+        # non_math rule, so the grammar is not needed
+        if not '$' in s:
+            state = self.get_state()
+            symbols = [Char(c, state) for c in s.expandtabs()]
+            self._expr = Hlist([Hlist(symbols)])
+            return self._expr
+        
         try:
             self._expression.parseString(s)
         except ParseException, err:
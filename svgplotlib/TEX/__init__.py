@@ -1,11 +1,12 @@
 #!python -u
 # -*- coding: utf-8 -*-
 # Copyright © 2007 by Runar Tenfjord, Tenko.
-import re
 
 def isTEX(s):
     """Check if string is a TEX string"""
-    if re.match(r'.*\$.+\$.*', s, re.MULTILINE | re.DOTALL):
+    # a pair of '$' with at least one character between
+    start = s.find('$')
+    if start >= 0 and s.find('$', start + 2) >= 0:
         return True
         
     return False
\ No newline at end of file
@@ -2,16 +2,36 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
+import threading
+import tempfile
 from os.path import join, abspath, dirname, expandvars
 from collections import namedtuple
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 import svgplotlib.Config as Config
 from freetype import FT2Font
-from svgplotlib.SVG import SVG, tex_parser, tex_fonts
+from svgplotlib.SVG import SVG, parseTEX
 from svgplotlib.Scale import Scale
+from svgplotlib.Cache import LRUCache
 
 Size = namedtuple('Size', 'width height descent')
 
+# measured text sizes keyed by (font file, size, text)
+_textsizes = LRUCache(8192)
+
+# glyph paths and advances keyed by (font file, size, char code)
+_glyphs = LRUCache(16384)
+
+def formatTick(value):
+    '''
+    Default tick label format
+    '''
+    return u"%g" % value
+
 class Base(SVG):
     """
     Base class for all plots
@@ -37,38 +57,67 @@ class Base(SVG):
         self.xmajorTicks, self.xminorTicks = None,None
         self.ymajorTicks, self.yminorTicks = None,None
         
+        # formatted and measured tick labels
+        self.tickLabelCache = {}
+        
         # font
         self.fontFamily = kwargs.get('fontFamily', Config.DEFAULTFONT     )
         self.fontStyle  = kwargs.get('fontStyle',  Config.DEFAULTFONTSTYLE)
         self.fontSize   = kwargs.get('fontSize',   Config.DEFAULTFONTSIZE )
         
-        font = self.font = getFont(family = self.fontFamily, style = self.fontStyle)
-        font.set_size(self.fontSize)
+        self.font = getFont(family = self.fontFamily, style = self.fontStyle,
+                            size = self.fontSize)
     
     def textSize(self, text):
         if not text:
             return Size(0., 0., 0.)
-            
-        self.font.set_text(text)
-        width, height = self.font.get_width_height()
         
-        descent = self.font.get_descent()
+        font = self.font
+        fontsize = (self.fontSize, 72)
+        key = (font.fname, fontsize, text)
+        size = _textsizes.get(key)
+        if size is None:
+            # the size is set again in case the shared font was resized
+            with font.lock:
+                font.set_size(*fontsize)
+                font.set_text(text)
+                width, height = font.get_width_height()
+                
+                descent = font.get_descent()
+            
+            size = _textsizes[key] = Size(width/64., height/64., descent/64.)
         
-        return Size(width/64., height/64., descent/64.)
+        return size
     
     def TEXSize(self,  text, fontSize = 24, dpi = 72):
         if not text:
             return Size(0., 0., 0.)
         
-        box = tex_parser.parse(text, tex_fonts, fontSize, dpi)
+        box = parseTEX(text, fontSize, dpi)
         
         return Size(box.width, box.height, box.depth - 5)
             
+    def tickLabels(self, ticks, fmt = None):
+        '''
+        Format and measure labels of ticks. Returns list of
+        (text, size). The result is kept so layout and drawing
+        of an axis format and measure each label only once.
+        '''
+        if fmt is None:
+            fmt = formatTick
+        
+        key = tuple(ticks), fmt
+        labels = self.tickLabelCache.get(key)
+        if labels is None:
+            texts = [unicode(fmt(value)) for value in ticks]
+            textSize = self.textSize
+            labels = self.tickLabelCache[key] = [(s, textSize(s)) for s in texts]
+        
+        return labels
+    
     def buildTicks(self, minx, maxx, maxNumSteps = 5, maxMinSteps = 2):
         scale = Scale()
-        stepSize = scale.autoScale(minx, maxx, maxNumSteps)
-        x1, x2 =  scale.buildTicks(minx, maxx, stepSize, maxMinSteps = maxMinSteps)
-        return x1, x2
+        return scale.autoTicks(minx, maxx, maxNumSteps, maxMinSteps)
         
     def grid(self):
         xscale = self.xscale
@@ -97,9 +146,6 @@ class Base(SVG):
     def xaxis(self, pos, flip = False, text = True, fmt = None):
         xscale = self.xscale
         
-        if fmt is None:
-            fmt = lambda x: u"%g" % x
-            
         sc = -1 if flip else 1
         path_data = []
         add = path_data.append
@@ -111,10 +157,10 @@ class Base(SVG):
             add('L %g,%g' % (xpos, pos - sc*self.TICK))
             
         if text:
-            for x in self.xmajorTicks:
-                s = unicode(fmt(x))
-                size = self.textSize(s)
-                
+            g = self.plotArea.Group(**self.textStyle)
+            labels = self.tickLabels(self.xmajorTicks, fmt)
+            
+            for x, (s, size) in zip(self.xmajorTicks, labels):
                 x = x - self.minx
                 
                 if flip:
@@ -124,7 +170,7 @@ class Base(SVG):
                     
                 xpos = x*self.xscale - .5*size.width
                 
-                self.plotArea.EText(self.font, s, x = xpos, y = ypos, **self.textStyle)
+                g.EText(self.font, s, x = xpos, y = ypos)
             
         for x in self.xminorTicks:
             x = x - self.minx
@@ -139,9 +185,6 @@ class Base(SVG):
         height = self.plotHeight
         sc = -1 if flip else 1
         
-        if fmt is None:
-            fmt = lambda y: u"%g" % y
-            
         path_data = []
         add = path_data.append
         
@@ -152,10 +195,10 @@ class Base(SVG):
             add('L %g,%g' % (pos + sc*self.TICK, ypos))
             
         if text:
-            for y in self.ymajorTicks:
-                s = unicode(fmt(y))
-                size = self.textSize(s)
-                
+            g = self.plotArea.Group(**self.textStyle)
+            labels = self.tickLabels(self.ymajorTicks, fmt)
+            
+            for y, (s, size) in zip(self.ymajorTicks, labels):
                 y = y - self.miny
                 
                 if flip:
@@ -165,7 +208,7 @@ class Base(SVG):
                 
                 ypos = height - y*yscale + .5*size.height
                 
-                self.plotArea.EText(self.font, s, x = xpos, y = ypos, **self.textStyle)
+                g.EText(self.font, s, x = xpos, y = ypos)
         
         for y in self.yminorTicks:
             y = y - self.miny
@@ -178,6 +221,87 @@ class Base(SVG):
 class Font(FT2Font):
     def __init__(self, fname):
         FT2Font.__init__(self, fname)
+        self._size = None
+        self._charmap = None
+        self._prefix = None
+        
+        # held while a sequence of calls uses the FreeType state
+        self.lock = threading.RLock()
+    
+    @property
+    def charmap(self):
+        if self._charmap is None:
+            self._charmap = self.get_charmap()
+        
+        return self._charmap
+    
+    @property
+    def prefix(self):
+        '''
+        Glyph id prefix, family and style without spaces
+        '''
+        if self._prefix is None:
+            family = self.family_name.replace(' ','')
+            style = self.style_name.replace(' ','')
+            self._prefix = "%s-%s" % (family, style)
+        
+        return self._prefix
+    
+    def set_size(self, ptsize, dpi = 72):
+        '''
+        Set font size. The FreeType call is skipped
+        if the size is unchanged.
+        '''
+        if self._size != (ptsize, dpi):
+            FT2Font.set_size(self, ptsize, dpi)
+            self._size = ptsize, dpi
+    
+    def SVGGlyph(self, ccode):
+        '''
+        Return SVG path and advance of glyph at the current
+        size. Results are shared between all documents.
+        '''
+        key = (self.fname, self._size, ccode)
+        ret = _glyphs.get(key)
+        if not ret is None:
+            return ret
+        
+        with self.lock:
+            return self.buildSVGGlyph(key, ccode)
+    
+    def buildSVGGlyph(self, key, ccode):
+        '''
+        Load glyph and convert outline to SVG path
+        '''
+        glyph = self.load_char(ccode)
+        
+        path_data = []
+        append = path_data.append
+        
+        for step in glyph.path:
+            code = step[0]
+
+            if code == 0:   # MOVE_TO
+                x, y = step[1:]
+                append('M %g %g' % (x, -y))
+                
+            elif code == 1: # LINE_TO
+                x, y = step[1:]
+                append('L %g %g' % (x, -y))
+                
+            elif code == 2: # CURVE3
+                x1, y1, x2, y2 = step[1:]
+                append('Q %g %g %g %g' % (x1, -y1, x2, -y2))
+                
+            elif code == 3: # CURVE4
+                x1, y1, x2, y2, x3, y3 = step[1:]
+                append('C %g %g %g %g %g %g' % (x1, -y1, x2, -y2, x3, -y3))
+                
+            elif code == 4: # ENDPOLY
+                append('Z')
+        
+        ret = _glyphs[key] = (" ".join(path_data), glyph.linearHoriAdvance / 65536.)
+        return ret
     
     def SVGGlyphs(self, text, glyps_seen = None):
         '''
@@ -186,75 +310,60 @@ class Font(FT2Font):
         if glyps_seen is None:
             glyps_seen = set()
             
-        family = self.family_name.replace(' ','')
-        style = self.style_name.replace(' ','')
+        prefix = self.prefix
         
         glyph_map = {}
-        cmap = self.get_charmap()
+        cmap = self.charmap
         lastgind = None
         
         currx = 0
         xpositions = []
         glyph_ids = []
         
-        for c in text:
-            ccode = ord(c)
-            gind = cmap.get(ccode)
-            
-            if gind is None:
-                ccode = ord('?')
-                gind = 0
+        # size, kerning and advances from one consistent state
+        with self.lock:
+            for c in text:
+                ccode = ord(c)
+                gind = cmap.get(ccode)
                 
-            if lastgind is None:
-                kern = 0
-            else:
-                kern = self.get_kerning(lastgind, gind)
-            
-            glyph = self.load_char(ccode)
-            
-            char_id = "%s-%s-%d" % (family, style, ccode)
-            if not char_id in glyps_seen:
-                path_data = []
-                append = path_data.append
+                if gind is None:
+                    ccode = ord('?')
+                    gind = 0
+                    
+                if lastgind is None:
+                    kern = 0
+                else:
+                    kern = self.get_kerning(lastgind, gind)
                 
-                for step in glyph.path:
-                    code = step[0]
-
-                    if code == 0:   # MOVE_TO
-                        x, y = step[1:]
-                        append('M %g %g' % (x, -y))
-                        
-                    elif code == 1: # LINE_TO
-                        x, y = step[1:]
-                        append('L %g %g' % (x, -y))
-                        
-                    elif code == 2: # CURVE3
-                        x1, y1, x2, y2 = step[1:]
-                        append('Q %g %g %g %g' % (x1, -y1, x2, -y2))
-                        
-                    elif code == 3: # CURVE4
-                        x1, y1, x2, y2, x3, y3 = step[1:]
-                        append('C %g %g %g %g %g %g' % (x1, -y1, x2, -y2, x3, -y3))
-                        
-                    elif code == 4: # ENDPOLY
-                        append('Z')
+                path, advance = self.SVGGlyph(ccode)
                 
-                glyps_seen.add(char_id)
-                glyph_map[char_id] = " ".join(path_data)
-            
-            currx += (kern / 64.0)
+                char_id = "%s-%d" % (prefix, ccode)
+                if not char_id in glyps_seen:
+                    glyps_seen.add(char_id)
+                    glyph_map[char_id] = path
+                
+                currx += (kern / 64.0)
 
-            xpositions.append(currx)
-            glyph_ids.append(char_id)
+                xpositions.append(currx)
+                glyph_ids.append(char_id)
 
-            currx += glyph.linearHoriAdvance / 65536.
-            lastgind = gind
+                currx += advance
+                lastgind = gind
         
         return xpositions, glyph_ids, glyph_map
     
 _fonts = {}
+_fontcache = {}
+_fontlock = threading.Lock()
 
-def getFont(family = Config.DEFAULTFONT, style = Config.DEFAULTFONTSTYLE):
+def getFont(family = Config.DEFAULTFONT, style = Config.DEFAULTFONTSTYLE,
+            size = Config.DEFAULTFONTSIZE, dpi = 72):
+    '''
+    Return the shared Font instance for family, style and size.
+    Each font file is only opened once per size and process. Use
+    getFont with another size rather than set_size, as set_size
+    changes the size for all users of the instance.
+    '''
     try:
         variants = _fonts[family]
     except KeyError:
@@ -265,7 +374,15 @@ def getFont(family = Config.DEFAULTFONT, style = Config.DEFAULTFONTSTYLE):
     except KeyError:
         path = variants[Config.DEFAULTFONTSTYLE]
     
-    return Font(path)
+    key = (path, size, dpi)
+    with _fontlock:
+        font = _fontcache.get(key)
+        if font is None:
+            font = Font(path)
+            font.set_size(size, dpi)
+            _fontcache[key] = font
+    
+    return font
 
 # load fonts into dict
 config = Config.config
@@ -274,20 +391,133 @@ if config.has_option('fonts', 'fontpaths'):
 else:
     defaults = config.defaults() 
     fontpaths = defaults['defaultfonts'], defaults['sysfonts']
+
+FONTEXTENSIONS = frozenset(('.ttf', '.otf'))
+FONTINDEXVERSION = 1
+
+def loadFontIndex(filename = Config.FONTINDEX):
+    '''
+    Read the on-disk font index. Returns a dict mapping font
+    directory to {filename : (mtime, size, family, style)}.
+    '''
+    if not filename or not os.path.exists(filename):
+        return {}
+    
+    try:
+        with open(filename, 'rb') as fh:
+            index = pickle.load(fh)
+    except Exception:
+        # unreadable or stale index, rebuild
+        return {}
     
-for fontpath in fontpaths:
-    if not os.path.exists(fontpath):
-                continue
+    if not isinstance(index, dict) or index.get('version') != FONTINDEXVERSION:
+        return {}
     
+    return index['paths']
+
+def saveFontIndex(paths, filename = Config.FONTINDEX):
+    '''
+    Write the font index to disk. Failure to write is ignored
+    as the index is only a cache.
+    '''
+    if not filename:
+        return
+    
+    index = {'version' : FONTINDEXVERSION, 'paths' : paths}
+    
+    # unique temporary file in the same folder, so processes
+    # writing at the same time do not overwrite each other
+    try:
+        fd, tmpname = tempfile.mkstemp(dir = os.path.dirname(filename) or os.curdir,
+                                       suffix = '.tmp')
+    except (IOError, OSError):
+        return
+    
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump(index, fh, pickle.HIGHEST_PROTOCOL)
+        
+        if sys.platform == "win32" and os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmpname, filename)
+    except (IOError, OSError):
+        try:
+            os.remove(tmpname)
+        except OSError:
+            pass
+
+def scanFontPath(fontpath, cached = None):
+    '''
+    Return index entries for all fonts in fontpath. Fonts with the
+    same mtime and size as in the cached entries are not opened.
+    '''
+    if cached is None:
+        cached = {}
+    
+    entries = {}
     for filename in os.listdir(fontpath):
         name, ext = os.path.splitext(filename)
-        if ext.lower() not in frozenset(('.ttf', '.otf')):
+        if ext.lower() not in FONTEXTENSIONS:
             continue
         
         path = os.path.join(fontpath, filename)
-        font = FT2Font(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
         
-        _fonts.setdefault(font.family_name, {})[font.style_name] = path
+        entry = cached.get(filename)
+        if entry is None or entry[:2] != (stat.st_mtime, stat.st_size):
+            font = FT2Font(path)
+            entry = (stat.st_mtime, stat.st_size, font.family_name, font.style_name)
+        
+        entries[filename] = entry
+    
+    return entries
+
+def updateFonts(rebuild = False):
+    '''
+    Update the font dict from the configured font paths. The on-disk
+    index is consulted unless rebuild is True, and written back if
+    anything changed.
+    '''
+    index = loadFontIndex()
+    cached = {} if rebuild else index
+    
+    paths = {}
+    for fontpath in fontpaths:
+        if not os.path.exists(fontpath):
+            continue
+        
+        paths[fontpath] = scanFontPath(fontpath, cached.get(fontpath))
+    
+    changed = [fontpath for fontpath, entries in paths.iteritems()
+               if index.get(fontpath) != entries]
+    if rebuild or changed:
+        # keep entries of font paths not configured in this process
+        index = dict(index)
+        index.update(paths)
+        saveFontIndex(index)
+    
+    _fonts.clear()
+    _fontcache.clear()
+    _textsizes.clear()
+    _glyphs.clear()
+    for fontpath in fontpaths:
+        entries = paths.get(fontpath, {})
+        for filename in sorted(entries):
+            mtime, size, family, style = entries[filename]
+            path = os.path.join(fontpath, filename)
+            _fonts.setdefault(family, {})[style] = path
+
+def rebuildFontIndex():
+    '''
+    Rescan all font paths, opening every font file, and
+    rewrite the on-disk font index.
+    '''
+    updateFonts(rebuild = True)
+
+updateFonts()
 
 if __name__ == '__main__':
     font = getFont()